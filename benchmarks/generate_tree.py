@@ -0,0 +1,189 @@
+"""Generate a large synthetic download folder for benchmarking.
+
+    python benchmarks/generate_tree.py /tmp/bench_tree --files 100000
+
+The tree mixes nested folders, real image headers, text and code, binary
+formats that only the sniffer recognises, unknown extensions that go to
+the AI, byte-identical duplicates and junk files. Output is reproducible
+for a given seed.
+"""
+
+import argparse
+import io
+import json
+import random
+from pathlib import Path
+
+from PIL import Image
+
+words = ["report", "invoice", "holiday", "notes", "budget", "draft", "scan", "photo", "meeting",
+         "backup", "final", "v2", "summary", "project", "recipe", "letter", "contract", "old"]
+
+# kind: (weight, extensions)
+kinds = {
+    "image": (20, ["jpg", "png", "gif", "webp"]),
+    "text": (20, ["txt", "md"]),
+    "code": (15, ["py", "js", "json", "sh", "html"]),
+    "doc": (10, ["pdf", "docx"]),
+    "audio": (5, ["mp3", "flac"]),
+    "video": (3, ["mp4", "mkv"]),
+    "archive": (5, ["zip", "gz", "tar"]),
+    "unknown": (15, ["dat", "bin", "xyz", ""]),
+    "disguised": (7, ["", "download", "file"]),
+}
+
+junk_names = ["thumbs.db", "desktop.ini", ".DS_Store"]
+junk_exts = ["tmp", "crdownload", "log"]
+
+# Multiplies every median size; the default keeps a 100k tree around 700MB.
+size_scale = 1.0
+
+_headers = {
+    "pdf": b"%PDF-1.4\n",
+    "docx": b"PK\x03\x04" + b"\x00" * 22 + b"\x11\x00\x00\x00" + b"word/document.xml",
+    "mp3": b"ID3\x03\x00\x00\x00\x00\x00\x00",
+    "flac": b"fLaC\x00\x00\x00\x22",
+    "mp4": b"\x00\x00\x00\x18ftypisom",
+    "mkv": b"\x1a\x45\xdf\xa3",
+    "zip": b"PK\x03\x04" + b"\x00" * 22 + b"\x08\x00\x00\x00" + b"data.bin",
+    "gz": b"\x1f\x8b\x08\x00",
+}
+
+
+def _size(rng, median):
+    # Log-normal sizes: most files small, a long tail of large ones.
+    return max(16, min(int(rng.lognormvariate(0, 1.2) * median * size_scale), 8 * 1024 * 1024))
+
+
+def _bytes(rng, n):
+    return rng.getrandbits(n * 8).to_bytes(n, "little")
+
+
+def _images(rng, count=8):
+    blobs = {}
+    for fmt, ext in (("PNG", "png"), ("JPEG", "jpg"), ("GIF", "gif"), ("WEBP", "webp")):
+        variants = []
+        for _ in range(count):
+            im = Image.new("RGB", (rng.randint(32, 256), rng.randint(32, 256)),
+                           tuple(rng.randrange(256) for _ in range(3)))
+            buf = io.BytesIO()
+            im.save(buf, fmt)
+            variants.append(buf.getvalue())
+        blobs[ext] = variants
+    return blobs
+
+
+def _text(rng, size):
+    out = []
+    n = 0
+    while n < size:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(4, 12))) + "\n"
+        out.append(line)
+        n += len(line)
+    return "".join(out)[:size].encode()
+
+
+def _code(rng, ext, size):
+    if ext == "json":
+        body = json.dumps({rng.choice(words): rng.randint(0, 999) for _ in range(max(1, size // 20))})
+    elif ext == "sh":
+        body = "#!/bin/sh\n" + "".join(f"echo {rng.choice(words)}\n" for _ in range(max(1, size // 12)))
+    elif ext == "html":
+        body = "<html><body>" + "".join(f"<p>{rng.choice(words)}</p>" for _ in range(max(1, size // 12)))
+    else:
+        body = "".join(f"def {rng.choice(words)}_{i}():\n    return {i}\n\n" for i in range(max(1, size // 30)))
+    return body.encode()
+
+
+def _content(rng, kind, ext, images):
+    if kind == "image":
+        # Trailing bytes after the image data are ignored by decoders but
+        # make every file unique.
+        return rng.choice(images[ext]) + _bytes(rng, rng.randint(8, 64))
+    if kind == "text":
+        return _text(rng, _size(rng, 2048))
+    if kind == "code":
+        return _code(rng, ext, _size(rng, 1500))
+    if kind in ("doc", "audio", "video", "archive"):
+        header = _headers.get(ext, b"")
+        if ext == "tar":
+            header = b"\x00" * 257 + b"ustar\x0000"
+        median = {"doc": 8 * 1024, "audio": 16 * 1024, "video": 32 * 1024, "archive": 8 * 1024}[kind]
+        return header + _bytes(rng, _size(rng, median))
+    if kind == "disguised":
+        # Known formats saved without a useful extension, for the sniffer.
+        ext = rng.choice(["pdf", "zip", "mp3", "gz"])
+        return _headers[ext] + _bytes(rng, _size(rng, 16 * 1024))
+    return _bytes(rng, _size(rng, 4096)) if rng.random() < 0.5 else _text(rng, _size(rng, 1024))
+
+
+def generate_tree(root, files=100000, depth=6, fanout=8, dup_ratio=0.05, junk_ratio=0.02, seed=0):
+    """Write the tree under root and return a summary dict"""
+    rng = random.Random(seed)
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    images = _images(rng)
+    dirs = [root]
+    for level in range(depth):
+        for parent in list(dirs):
+            if len(dirs) >= max(1, files // 50):
+                break
+            for _ in range(rng.randint(1, fanout)):
+                d = parent / f"{rng.choice(words)}_{level}_{len(dirs)}"
+                d.mkdir(exist_ok=True)
+                dirs.append(d)
+    names = list(kinds)
+    weights = [kinds[k][0] for k in names]
+    written = []
+    summary = {"root": str(root), "files": 0, "bytes": 0, "dirs": len(dirs), "duplicates": 0,
+               "junk": 0, "by_kind": {}, "seed": seed}
+    for i in range(files):
+        folder = rng.choice(dirs)
+        r = rng.random()
+        if r < junk_ratio:
+            name = rng.choice(junk_names) if rng.random() < 0.3 else f"{rng.choice(words)}_{i}.{rng.choice(junk_exts)}"
+            data = _bytes(rng, rng.randint(16, 512))
+            summary["junk"] += 1
+        elif r < junk_ratio + dup_ratio and written:
+            source = rng.choice(written)
+            name = f"{rng.choice(words)} ({rng.randint(1, 9)})_{i}{source.suffix}"
+            data = source.read_bytes()
+            summary["duplicates"] += 1
+        else:
+            kind = rng.choices(names, weights)[0]
+            ext = rng.choice(kinds[kind][1])
+            data = _content(rng, kind, ext, images)
+            stem = f"{rng.choice(words)}_{rng.choice(words)}_{i}"
+            name = f"{stem}.{ext}" if ext else stem
+            summary["by_kind"][kind] = summary["by_kind"].get(kind, 0) + 1
+        target = folder / name
+        if target.exists():
+            target = folder / f"{i}_{name}"
+        with open(target, "wb") as f:
+            f.write(data)
+        if len(written) < 5000:
+            written.append(target)
+        summary["files"] += 1
+        summary["bytes"] += len(data)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic file tree for benchmarks")
+    parser.add_argument("root")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--dup-ratio", type=float, default=0.05)
+    parser.add_argument("--junk-ratio", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size-scale", type=float, default=1.0, help="Multiply all file sizes")
+    args = parser.parse_args()
+    global size_scale
+    size_scale = args.size_scale
+    summary = generate_tree(args.root, args.files, args.depth, dup_ratio=args.dup_ratio,
+                            junk_ratio=args.junk_ratio, seed=args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Benchmark sort_directory, show_metadata, show_hist and undo at scale.
+
+    python benchmarks/run_benchmarks.py --files 100000 --workers 8 -o bench.json
+    python benchmarks/run_benchmarks.py --tree /tmp/bench_tree --compare bench.json
+
+A synthetic tree is generated (or reused with --tree) and every stage
+runs in its own subprocess against the local stub AI endpoint, with HOME
+pointed at a scratch directory so the real cache and history are never
+touched. Each stage reports files/sec, p50/p99 per-file latency, peak
+RSS and read/write syscall counts (full counts with --strace). The sort
+stage is followed by undo, so a reused tree ends up where it started.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+from generate_tree import generate_tree
+
+console = Console()
+
+stages = ["sort", "metadata", "history", "undo"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def proc_io():
+    counters = {}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                counters[name.strip()] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def timed(module, name, samples):
+    fn = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    setattr(module, name, wrapper)
+
+
+def run_stage(stage, tree, workers, batch_size):
+    """Run one stage in this process and return its measurements"""
+    from shawtie import historydb
+    import shawtie.main as engine
+
+    engine.console.quiet = True
+    samples = {}
+    if stage == "sort":
+        samples = {"analyze_file": [], "commit_move": []}
+        timed(engine, "analyze_file", samples["analyze_file"])
+        timed(engine, "commit_move", samples["commit_move"])
+        call = lambda: engine.sort_directory(tree, Path(tree) / "sorted", workers=workers, batch_size=batch_size)
+        files = lambda: len(samples["commit_move"])
+    elif stage == "metadata":
+        samples = {"get_metadata": []}
+        timed(engine, "get_metadata", samples["get_metadata"])
+        call = lambda: engine.show_metadata(tree)
+        files = lambda: len(samples["get_metadata"])
+    elif stage == "history":
+        samples = {"show_hist": []}
+        timed(engine, "show_hist", samples["show_hist"])
+        call = engine.show_hist
+        files = historydb.count
+    elif stage == "undo":
+        samples = {"move": []}
+        timed(engine.shutil, "move", samples["move"])
+        call = engine.undo
+        files = lambda: len(samples["move"])
+    else:
+        raise ValueError(f"unknown stage {stage}")
+
+    io_before = proc_io()
+    cpu_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - start
+    cpu_after = resource.getrusage(resource.RUSAGE_SELF)
+    io_after = proc_io()
+    count = files()
+    report = {
+        "files": count,
+        "seconds": round(elapsed, 4),
+        "files_per_sec": round(count / elapsed, 2) if elapsed else None,
+        "cpu_user": round(cpu_after.ru_utime - cpu_before.ru_utime, 4),
+        "cpu_system": round(cpu_after.ru_stime - cpu_before.ru_stime, 4),
+        "peak_rss_kb": cpu_after.ru_maxrss,
+        "syscalls": {name: io_after[name] - io_before.get(name, 0)
+                     for name in ("syscr", "syscw") if name in io_after},
+        "io_bytes": {name: io_after[name] - io_before.get(name, 0)
+                     for name in ("rchar", "wchar", "read_bytes", "write_bytes") if name in io_after},
+        "latency_ms": {},
+    }
+    for name, values in samples.items():
+        report["latency_ms"][name] = {
+            "count": len(values),
+            "p50": round(percentile(values, 50) * 1000, 3) if values else None,
+            "p99": round(percentile(values, 99) * 1000, 3) if values else None,
+            "max": round(max(values) * 1000, 3) if values else None,
+        }
+    if stage == "sort":
+        report["cache"] = engine.cache.stats()
+    return report
+
+
+def parse_strace(path):
+    """Per-syscall call counts from an ``strace -c`` summary file"""
+    counts = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 5 or not parts[-1].isidentifier():
+                    continue
+                try:
+                    float(parts[0])
+                    counts[parts[-1]] = int(parts[3])
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return counts
+
+
+def run_child(stage, tree, args, env, scratch):
+    report_path = os.path.join(scratch, f"{stage}.json")
+    cmd = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--tree", str(tree),
+           "--workers", str(args.workers), "--batch-size", str(args.batch_size), "--report-to", report_path]
+    strace_path = None
+    if args.strace:
+        strace_path = os.path.join(scratch, f"{stage}.strace")
+        cmd = ["strace", "-f", "-c", "-o", strace_path] + cmd
+    # The pipeline prints per-file errors to stdout; keep stderr for tracebacks.
+    subprocess.run(cmd, env=env, check=True, stdout=subprocess.DEVNULL)
+    with open(report_path) as f:
+        report = json.load(f)
+    if strace_path:
+        counts = parse_strace(strace_path)
+        report["syscalls"]["total"] = counts.pop("total", sum(counts.values()))
+        report["syscalls"]["by_name"] = dict(sorted(counts.items(), key=lambda kv: -kv[1])[:20])
+    return report
+
+
+def show_report(result, previous=None):
+    tab = Table(title="Benchmark", box=box.ROUNDED, header_style="bold magenta")
+    tab.add_column("Stage", style="cyan")
+    tab.add_column("Files", justify="right")
+    tab.add_column("Seconds", justify="right")
+    tab.add_column("Files/sec", justify="right", style="green")
+    tab.add_column("p50 ms", justify="right")
+    tab.add_column("p99 ms", justify="right")
+    tab.add_column("Peak RSS", justify="right")
+    tab.add_column("Syscalls", justify="right")
+    if previous:
+        tab.add_column("vs. previous", justify="right")
+    for stage, r in result["stages"].items():
+        lat = next(iter(r["latency_ms"].values()), {})
+        syscalls = r["syscalls"].get("total", r["syscalls"].get("syscr", 0) + r["syscalls"].get("syscw", 0))
+        row = [stage, str(r["files"]), f"{r['seconds']:.2f}", f"{r['files_per_sec'] or 0:.1f}",
+               str(lat.get("p50")), str(lat.get("p99")), f"{r['peak_rss_kb'] / 1024:.0f} MB", str(syscalls)]
+        if previous:
+            old = previous.get("stages", {}).get(stage)
+            if old and old.get("files_per_sec") and r["files_per_sec"]:
+                change = (r["files_per_sec"] / old["files_per_sec"] - 1) * 100
+                row.append(f"[{'green' if change >= 0 else 'red'}]{change:+.1f}%[/]")
+            else:
+                row.append("-")
+        tab.add_row(*row)
+    console.print(tab)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shawtie pipeline on a synthetic tree")
+    parser.add_argument("--files", type=int, default=100000, help="Files to generate (default: 100000)")
+    parser.add_argument("--tree", help="Use (or create) the tree at this path instead of a scratch copy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub AI response time in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests that fail")
+    parser.add_argument("--stages", default=",".join(stages), help="Comma-separated subset of " + ",".join(stages))
+    parser.add_argument("--strace", action="store_true", help="Count every syscall with strace -c")
+    parser.add_argument("--compare", metavar="JSON", help="Earlier report to compare files/sec against")
+    parser.add_argument("-o", "--output", metavar="JSON", help="Where to save the report")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    parser.add_argument("--report-to", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        report = run_stage(args.stage, args.tree, args.workers, args.batch_size)
+        with open(args.report_to, "w") as f:
+            json.dump(report, f)
+        return
+
+    if args.strace and not shutil.which("strace"):
+        parser.error("--strace needs strace on PATH")
+    selected = [s.strip() for s in args.stages.split(",") if s.strip()]
+    for s in selected:
+        if s not in stages:
+            parser.error(f"unknown stage {s}")
+
+    scratch = tempfile.mkdtemp(prefix="shawtie-bench-")
+    home = Path(scratch) / "home"
+    home.mkdir()
+    tree = Path(args.tree) if args.tree else Path(scratch) / "tree"
+    try:
+        if tree.exists() and any(tree.iterdir()):
+            console.print(f"[cyan]Reusing tree[/cyan] {tree}")
+            tree_info = {"root": str(tree), "reused": True}
+        else:
+            console.print(f"[cyan]Generating {args.files} files in[/cyan] {tree}")
+            start = time.perf_counter()
+            tree_info = generate_tree(tree, args.files, seed=args.seed)
+            tree_info["generate_seconds"] = round(time.perf_counter() - start, 2)
+
+        from shawtie import stub_server
+        server, url = stub_server.start(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+        env = dict(os.environ, HOME=str(home), SHAWTIE_API_URL=url)
+        env.pop("SHAWTIE_API_KEY", None)
+
+        result = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "params": {"workers": args.workers, "batch_size": args.batch_size,
+                       "latency": args.latency, "error_rate": args.error_rate},
+            "tree": tree_info,
+            "stages": {},
+        }
+        for stage in selected:
+            console.print(f"[bold]▶ {stage}[/bold]")
+            result["stages"][stage] = run_child(stage, tree, args, env, scratch)
+        config = server.RequestHandlerClass.config
+        result["stub"] = {"requests": config.requests, "errors": config.errors, "throttled": config.throttled}
+        server.shutdown()
+    finally:
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    show_report(result, previous)
+    output = args.output or f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    console.print(f"[green]Report saved to[/green] {output}")
+
+
+if __name__ == "__main__":
+    main()
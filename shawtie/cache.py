@@ -0,0 +1,198 @@
+"""Persistent, content-addressed cache for AI results"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from . import instrument
+
+path = Path.home() / ".smartsort_cache.db"
+enabled = True
+max_entries = 100_000
+max_bytes = 64 * 1024 * 1024
+
+_conn = None
+_lock = threading.Lock()
+_count = 0
+_bytes = 0
+_stats = {"hits": 0, "misses": 0}
+# key -> access time of hits not yet written; flushed in batches so a fully
+# cached run doesn't commit once per answer.
+_touched = {}
+touch_batch = 256
+
+
+def configure(enabled=None, path=None, max_entries=None, max_bytes=None):
+    """Update cache settings; the database is reopened on next use"""
+    with _lock:
+        _set(enabled, path, max_entries, max_bytes)
+
+
+def _set(new_enabled, new_path, new_max_entries, new_max_bytes):
+    global enabled, path, max_entries, max_bytes, _conn
+    if new_enabled is not None:
+        enabled = new_enabled
+    if new_path is not None:
+        path = Path(new_path)
+    if new_max_entries is not None:
+        max_entries = new_max_entries
+    if new_max_bytes is not None:
+        max_bytes = new_max_bytes
+    if _conn is not None:
+        _write_touched(_conn)
+        _conn.commit()
+        _conn.close()
+        _conn = None
+
+
+def _db():
+    global _conn, _count, _bytes
+    if _conn is None:
+        _conn = sqlite3.connect(str(path), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        _count, _bytes = _conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    return _conn
+
+
+@lru_cache(maxsize=4096)
+@instrument.timed("hash")
+def _hash_file(file_path, size, mtime_ns):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    instrument.add("bytes_read", size)
+    return h.hexdigest()
+
+
+def content_hash(file_path):
+    """SHA-256 of a file's contents, memoised on (path, size, mtime)"""
+    st = os.stat(file_path)
+    return _hash_file(str(file_path), st.st_size, st.st_mtime_ns)
+
+
+def make_key(kind, file_path, model, version, extra=""):
+    parts = [kind, content_hash(file_path), model, str(version), extra]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def get(kind, file_path, model, version, extra=""):
+    """Return a cached result or None, counting the hit or miss"""
+    if not enabled:
+        return None
+    try:
+        key = make_key(kind, file_path, model, version, extra)
+    except OSError:
+        return None
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        _touched[key] = time.time()
+        if len(_touched) >= touch_batch:
+            _write_touched(db)
+            db.commit()
+        _stats["hits"] += 1
+    return json.loads(row[0])
+
+
+def put(kind, file_path, model, version, value, extra=""):
+    """Store a result; None values are not cached"""
+    global _count, _bytes
+    if not enabled or value is None:
+        return
+    try:
+        key = make_key(kind, file_path, model, version, extra)
+    except OSError:
+        return
+    data = json.dumps(value)
+    with _lock:
+        db = _db()
+        old = db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if old:
+            _count -= 1
+            _bytes -= old[0]
+        db.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, data, len(data), time.time()),
+        )
+        _count += 1
+        _bytes += len(data)
+        _write_touched(db)
+        if _count > max_entries or _bytes > max_bytes:
+            _evict(db)
+        db.commit()
+
+
+def _write_touched(db):
+    if _touched:
+        db.executemany("UPDATE entries SET accessed = ? WHERE key = ?", [(t, k) for k, t in _touched.items()])
+        _touched.clear()
+
+
+def flush():
+    """Write pending access times; runs at exit"""
+    with _lock:
+        if _conn is not None and _touched:
+            _write_touched(_conn)
+            _conn.commit()
+
+
+atexit.register(flush)
+
+
+def _evict(db):
+    global _count, _bytes
+    # Drop the least recently used tenth so eviction is amortised.
+    n = max(1, _count // 10, _count - max_entries)
+    db.execute(
+        "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)", (n,)
+    )
+    _count, _bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+
+def clear():
+    """Remove every cached entry and return how many were dropped"""
+    global _count, _bytes
+    with _lock:
+        db = _db()
+        dropped = _count
+        _touched.clear()
+        db.execute("DELETE FROM entries")
+        db.commit()
+        db.execute("VACUUM")
+        _count = _bytes = 0
+    return dropped
+
+
+def stats():
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": _count,
+            "bytes": _bytes,
+        }
+
+
+def reset_stats():
+    with _lock:
+        _stats["hits"] = 0
+        _stats["misses"] = 0
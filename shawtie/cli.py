@@ -1,11 +1,16 @@
 """Command-line interface for Shawtie"""
 
 import argparse
+import sys
 from rich.console import Console
 from rich.panel import Panel
 from rich.table import Table
 from rich import box
-from .main import sort_directory, show_metadata, show_hist, undo
+from .main import sort_directory, show_metadata, show_hist, show_sessions, undo
+from . import cache, client, instrument, learn, metaindex, metrics, provider
+from . import main as engine
+from .plan import apply_plan, make_plan
+from .watch import watch
 
 console = Console()
 
@@ -17,16 +22,46 @@ EXAMPLES = """
 
 [bold cyan]Preview Before Sorting:[/bold cyan]
   shawtie ~/Downloads --dry-run          Preview what will happen without moving files
+  shawtie ~/Downloads --dry-run --preview-ai
+                                         Include AI categories and names in the preview
+
+[bold cyan]Plan, Review, Apply:[/bold cyan]
+  shawtie plan ~/Downloads -o plan.json  Decide everything (AI included) without moving
+  shawtie apply plan.json                Do the moves from a reviewed plan, no AI calls
+
+[bold cyan]Watch Mode:[/bold cyan]
+  shawtie --watch ~/Downloads            Sort new downloads as they finish
+
+[bold cyan]AI Provider:[/bold cyan]
+  shawtie ~/Downloads --api-url http://localhost:8080/v1/chat/completions --llm-model llama3
+                                         Use a local OpenAI-compatible server
+  shawtie ~/Downloads --provider ~/work-ai.json
+                                         Load endpoint, key and models from a file
+  python -m shawtie.stub_server          Run a fake endpoint for offline testing
 
 [bold cyan]Metadata & History:[/bold cyan]
   shawtie --metadata photo.jpg           Show detailed file information
   shawtie --metadata ~/Pictures          Show metadata for all files in folder
+  shawtie --metadata ~/Pictures --panels Full details for every file in folder
   shawtie --history                      Show sorting history
   shawtie --undo                         Undo last sorting operation
+  shawtie --list-sessions                List previous sort runs
+  shawtie --undo 20250101-120000-ab12    Undo a specific run
 
 [bold cyan]Options:[/bold cyan]
   shawtie ~/Downloads --no-recursive     Only sort top-level files
   shawtie ~/Music -o ~/Sorted/Music      Custom output directory
+  shawtie ~/Downloads --workers 8        Run AI classification/renaming in parallel
+  shawtie ~/Downloads --batch-size 10    Classify unknown files 10 per AI request
+  shawtie ~/Downloads --profile          Show time spent per stage and per model
+  shawtie ~/Downloads --metrics-file /var/lib/node_exporter/textfile/shawtie.prom
+                                         Export Prometheus metrics for cron/systemd runs
+  shawtie ~/Music --duplicates report    List repeated files instead of sorting them
+  shawtie ~/Downloads --learn            Let a model trained on past sorts skip the LLM
+  shawtie ~/Downloads --resume           Continue a run that was interrupted
+  shawtie ~/Downloads --no-cache         Ignore cached AI results for this run
+  shawtie --clear-cache                  Empty the AI result cache
+  shawtie --compact-index                Drop metadata index rows for gone or changed files
 """
 
 def show_examples():
@@ -57,7 +92,69 @@ def show_examples():
     console.print(table)
     console.print()
 
-def main():
+def add_provider_args(parser):
+    parser.add_argument("--provider", metavar="FILE",
+                       help="JSON file describing the AI endpoint, key and models")
+    parser.add_argument("--api-url", metavar="URL",
+                       help="OpenAI-compatible chat completions URL to use instead of the default")
+    parser.add_argument("--llm-model", metavar="NAME", help="Model for text classification and naming")
+    parser.add_argument("--vlm-model", metavar="NAME", help="Model for image naming")
+
+def use_backend(args):
+    """Switch the engine to the provider described by the command line, if any"""
+    if args.provider or args.api_url or args.llm_model or args.vlm_model:
+        backend = provider.load(args.provider)
+        if args.api_url:
+            backend.url = args.api_url
+            backend.key = None
+        if args.llm_model:
+            backend.models["llm"] = args.llm_model
+        if args.vlm_model:
+            backend.models["vlm"] = args.vlm_model
+        engine.use_provider(backend)
+
+def plan_main(argv):
+    """shawtie plan DIR -o plan.json"""
+    parser = argparse.ArgumentParser(prog="shawtie plan",
+                                     description="Decide where every file goes and save it as a plan")
+    parser.add_argument("source", help="Directory to plan")
+    parser.add_argument("-o", "--output", default="plan.json", help="Plan file to write (default: plan.json)")
+    parser.add_argument("--dest", help="Destination directory (default: SOURCE/sorted)")
+    parser.add_argument("--no-recursive", action="store_false", dest="recursive",
+                       help="Only plan top-level files")
+    parser.add_argument("-w", "--workers", type=int, default=1, metavar="N")
+    parser.add_argument("--batch-size", type=int, default=1, metavar="N")
+    parser.add_argument("--duplicates", choices=["sort", "report", "quarantine", "hardlink", "off"],
+                       default="sort")
+    parser.add_argument("--learn", action="store_true")
+    parser.add_argument("--no-ai", action="store_true", help="Plan from rules, sniffing and the local model only")
+    parser.add_argument("--no-cache", action="store_true")
+    add_provider_args(parser)
+    args = parser.parse_args(argv)
+    use_backend(args)
+    if args.no_cache:
+        cache.configure(enabled=False)
+    make_plan(args.source, args.output, args.dest, args.recursive, workers=args.workers,
+              batch_size=args.batch_size, duplicates=args.duplicates, use_model=args.learn,
+              use_ai=not args.no_ai)
+
+def apply_main(argv):
+    """shawtie apply plan.json"""
+    parser = argparse.ArgumentParser(prog="shawtie apply",
+                                     description="Carry out a saved plan; no AI calls are made")
+    parser.add_argument("plan", help="Plan file written by shawtie plan")
+    args = parser.parse_args(argv)
+    try:
+        apply_plan(args.plan)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Cannot apply plan:[/red] {e}")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "plan":
+        return plan_main(argv[1:])
+    if argv and argv[0] == "apply":
+        return apply_main(argv[1:])
     parser = argparse.ArgumentParser(
         prog="shawtie",
         description="Shawtie - AI-powered file organization tool",
@@ -73,14 +170,62 @@ def main():
                        help="Only sort top-level files")
     parser.add_argument("--dry-run", action="store_true", 
                        help="Preview changes without moving files")
+    parser.add_argument("--preview-ai", action="store_true",
+                       help="With --dry-run, also show AI categories and names (results are cached for the real run)")
+    parser.add_argument("-w", "--workers", type=int, default=1, metavar="N",
+                       help="Number of parallel AI workers (default: 1)")
+    parser.add_argument("--batch-size", type=int, default=1, metavar="N",
+                       help="Classify up to N ambiguous files per AI request (default: 1)")
+    parser.add_argument("--duplicates", choices=["sort", "report", "quarantine", "hardlink", "off"],
+                       default="sort",
+                       help="How to handle files identical to one already seen (default: sort)")
+    parser.add_argument("--resume", action="store_true",
+                       help="Continue an interrupted sort of the same folder")
+    parser.add_argument("--watch", metavar="DIR",
+                       help="Keep running and sort new files in DIR as they arrive")
+    parser.add_argument("--settle", type=float, default=2.0, metavar="SECONDS",
+                       help="Quiet time before a watched file is sorted (default: 2)")
+    parser.add_argument("--learn", action="store_true",
+                       help="Use a local model trained on your sort history before asking the LLM")
+    parser.add_argument("--learn-threshold", type=float, metavar="P",
+                       help="Minimum model confidence to skip the LLM (default: 0.9)")
+    add_provider_args(parser)
+    parser.add_argument("--llm-rate", type=float, metavar="RPS",
+                       help="Max text-model requests per second")
+    parser.add_argument("--vlm-rate", type=float, metavar="RPS",
+                       help="Max vision-model requests per second")
+    parser.add_argument("--pool-size", type=int, metavar="N",
+                       help="Max keep-alive connections to the AI endpoint (default: 16)")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Don't read or write the AI result cache")
+    parser.add_argument("--clear-cache", action="store_true",
+                       help="Empty the AI result cache")
+    parser.add_argument("--profile", action="store_true",
+                       help="Show where the time went (per stage and per model) when done")
+    parser.add_argument("--profile-json", metavar="FILE",
+                       help="Write the profile as JSON to FILE")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                       help="Keep FILE updated with Prometheus metrics (node_exporter textfile collector)")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, metavar="SECONDS",
+                       help="How often to rewrite --metrics-file (default: 15)")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                       help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while running")
     parser.add_argument("--history", action="store_true", help="Show sorting history")
-    parser.add_argument("--undo", action="store_true", help="Undo last sort")
+    parser.add_argument("--undo", nargs="?", const=True, metavar="SESSION",
+                       help="Undo the last sort, or the given session")
+    parser.add_argument("--list-sessions", action="store_true", help="List previous sort runs")
     parser.add_argument("--metadata", metavar="PATH", help="Show file metadata")
+    parser.add_argument("--panels", action="store_true",
+                       help="With --metadata on a folder, show full panels for every file")
+    parser.add_argument("--no-index", action="store_true",
+                       help="Don't read or write the persistent metadata index")
+    parser.add_argument("--compact-index", action="store_true",
+                       help="Drop metadata index rows for deleted or changed files")
     parser.add_argument("--examples", action="store_true", 
                        help="Show usage examples and supported file types")
     parser.add_argument("--version", action="version", version="shawtie 1.0.2")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.examples:
         show_examples()
@@ -90,20 +235,80 @@ def main():
         show_hist()
         return
     
+    if args.list_sessions:
+        show_sessions()
+        return
+    
     if args.undo:
-        undo()
+        undo(None if args.undo is True else args.undo)
         return
     
+    if args.no_index:
+        metaindex.configure(enabled=False)
+    
+    if args.compact_index:
+        dropped = metaindex.compact()
+        console.print(f"[green]Dropped {dropped} stale metadata index entries[/green]")
+        if not args.source and not args.metadata:
+            return
+    
     if args.metadata:
-        show_metadata(args.metadata)
+        show_metadata(args.metadata, workers=args.workers if args.workers > 1 else None, panels=args.panels)
+        report_profile(args)
         return
     
-    if not args.source:
+    use_backend(args)
+    
+    if args.pool_size:
+        client.configure(pool_size=args.pool_size)
+    
+    if args.llm_rate:
+        client.set_limit(engine.llm, rate=args.llm_rate)
+    if args.vlm_rate:
+        client.set_limit(engine.vlm, rate=args.vlm_rate)
+    
+    if args.learn_threshold is not None:
+        learn.threshold = args.learn_threshold
+    
+    if args.no_cache:
+        cache.configure(enabled=False)
+    
+    if args.clear_cache:
+        dropped = cache.clear()
+        console.print(f"[green]Cleared {dropped} cached AI results[/green]")
+        if not args.source:
+            return
+    
+    if not args.watch and not args.source:
         console.print("[red]Error:[/red] Source directory required")
         console.print("\n[yellow]Tip:[/yellow] Run [cyan]shawtie --help[/cyan] or [cyan]shawtie --examples[/cyan] for usage")
         return
     
-    sort_directory(args.source, args.output, args.recursive, dry_run=args.dry_run)
+    exporter = metrics.TextfileExporter(args.metrics_file, args.metrics_interval).start() if args.metrics_file else None
+    server = metrics.serve(args.metrics_port) if args.metrics_port else None
+    try:
+        if args.watch:
+            watch(args.watch, args.output, args.recursive, workers=args.workers, settle=args.settle,
+                  use_model=args.learn)
+        else:
+            sort_directory(args.source, args.output, args.recursive, dry_run=args.dry_run or args.preview_ai,
+                           workers=args.workers, batch_size=args.batch_size,
+                           duplicates=args.duplicates, resume=args.resume, use_model=args.learn,
+                           preview_ai=args.preview_ai)
+    finally:
+        if exporter:
+            exporter.stop()
+        if server:
+            server.shutdown()
+    report_profile(args)
+
+def report_profile(args):
+    """Print and/or save the profile collected during the run"""
+    if args.profile:
+        instrument.show_profile(console)
+    if args.profile_json:
+        instrument.to_json(args.profile_json)
+        console.print(f"[dim]Profile written to {args.profile_json}[/dim]")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
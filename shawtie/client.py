@@ -0,0 +1,208 @@
+"""Shared, pooled HTTP client for AI requests"""
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import instrument
+
+pool_size = 16
+connect_timeout = 5
+read_timeout = 60
+max_retries = 4
+backoff_base = 0.5
+backoff_max = 30.0
+retry_status = (429, 500, 502, 503, 504)
+
+_session = None
+_lock = threading.Lock()
+
+
+def configure(pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None):
+    """Update client settings; the session is rebuilt on next use"""
+    with _lock:
+        _set(pool_size, connect_timeout, read_timeout, max_retries)
+
+
+def _set(new_pool_size, new_connect_timeout, new_read_timeout, new_max_retries):
+    global pool_size, connect_timeout, read_timeout, max_retries, _session
+    if new_pool_size is not None:
+        pool_size = new_pool_size
+    if new_connect_timeout is not None:
+        connect_timeout = new_connect_timeout
+    if new_read_timeout is not None:
+        read_timeout = new_read_timeout
+    if new_max_retries is not None:
+        max_retries = new_max_retries
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it if needed"""
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+def retry_after(response):
+    """Seconds to wait according to a Retry-After header, or None"""
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt, response=None):
+    """Exponential backoff with full jitter, overridden by Retry-After"""
+    delay = retry_after(response)
+    if delay is not None:
+        return min(delay, backoff_max)
+    return random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+
+
+class Limiter:
+    """Token bucket plus AIMD concurrency window for one model.
+
+    ``rate`` requests/second with bursts of up to ``burst`` are allowed
+    (no rate cap when rate is None). Independently, at most ``limit``
+    requests are in flight; the limit grows by about one per window of
+    successful responses and halves on a 429 or timeout. Only requests
+    started since the last cut can trigger another one, so a burst of
+    rejections from the same window halves the limit once.
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrency=None, initial_concurrency=4):
+        self.rate = rate
+        self.capacity = burst or (max(1.0, rate) if rate else None)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.max = max_concurrency or pool_size
+        self.limit = float(min(initial_concurrency, self.max))
+        self.active = 0
+        self.generation = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot and a token are free; returns a ticket for release()"""
+        with self.cond:
+            while self.active >= int(self.limit):
+                self.cond.wait()
+            self.active += 1
+            ticket = self.generation
+        while self.rate:
+            with self.cond:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+        return ticket
+
+    def release(self, ticket, outcome):
+        with self.cond:
+            self.active -= 1
+            if outcome == "ok":
+                self.limit = min(self.max, self.limit + 1.0 / self.limit)
+            elif outcome == "throttled" and ticket == self.generation:
+                self.limit = max(1.0, self.limit / 2)
+                self.generation += 1
+            self.cond.notify_all()
+
+
+# Per-model settings: {"model": {"rate": 2.0, "burst": 5, "max_concurrency": 8}}
+limits = {}
+_limiters = {}
+
+
+def set_limit(model, rate=None, burst=None, max_concurrency=None):
+    """Configure the rate limit for one model; replaces its limiter"""
+    with _lock:
+        limits[model] = {"rate": rate, "burst": burst, "max_concurrency": max_concurrency}
+        _limiters.pop(model, None)
+
+
+def limiter(model):
+    with _lock:
+        lim = _limiters.get(model)
+        if lim is None:
+            lim = _limiters[model] = Limiter(**limits.get(model, {}))
+        return lim
+
+
+def post(url, model=None, **kwargs):
+    """POST through the pooled session, retrying transient failures.
+
+    When model is given, every attempt goes through that model's limiter
+    and reports back whether it succeeded or was throttled.
+    """
+    kwargs.setdefault("timeout", (connect_timeout, read_timeout))
+    if "json" in kwargs:
+        # Encode once so the upload size is known and retries reuse the bytes.
+        kwargs["data"] = json.dumps(kwargs.pop("json")).encode()
+        kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"Content-Type": "application/json"})
+    uploaded = len(kwargs.get("data") or b"")
+    session = get_session()
+    lim = limiter(model) if model else None
+    attempt = 0
+    while True:
+        response = None
+        ticket = lim.acquire() if lim else None
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            instrument.add("requests", model=model)
+            instrument.add("bytes_uploaded", uploaded, model=model)
+            if attempt:
+                instrument.add("retries", model=model)
+            response = session.post(url, **kwargs)
+            if response.status_code == 429:
+                outcome = "throttled"
+            elif response.status_code < 500:
+                outcome = "ok"
+            if response.status_code not in retry_status or attempt >= max_retries:
+                response.raise_for_status()
+                return response
+        except requests.exceptions.Timeout:
+            outcome = "throttled"
+            if attempt >= max_retries:
+                raise
+        except requests.exceptions.ConnectionError:
+            if attempt >= max_retries:
+                raise
+        finally:
+            instrument.observe("ai", time.perf_counter() - start, model)
+            if outcome == "throttled":
+                instrument.add("throttled", model=model)
+            if lim:
+                lim.release(ticket, outcome)
+        time.sleep(backoff_delay(attempt, response))
+        attempt += 1
@@ -0,0 +1,99 @@
+"""Tiered duplicate detection: size, then partial hash, then full hash"""
+
+import hashlib
+import os
+
+from . import cache, instrument
+
+modes = ["sort", "report", "quarantine", "hardlink", "off"]
+
+
+@instrument.timed("partial_hash")
+def partial_hash(file_path, num_bytes=4096):
+    """Hash of the file size plus its first and last num_bytes"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(str(size).encode())
+        h.update(f.read(num_bytes))
+        if size > num_bytes * 2:
+            f.seek(-num_bytes, os.SEEK_END)
+            h.update(f.read(num_bytes))
+    instrument.add("bytes_read", min(size, num_bytes * 2))
+    return h.hexdigest()
+
+
+class DuplicateIndex:
+    """Remembers files by size and finds earlier files with identical content.
+
+    The first file of a size is stored unhashed, so trees with mostly
+    unique sizes cost nothing beyond the scan. Once a size repeats, its
+    files are grouped by partial hash and only a group's members are fully
+    hashed against each other. Only strings are kept: paths, plus the
+    category and name chosen for each file (see ``decided``). Call ``moved``
+    when a file is relocated so later duplicates are compared against where
+    it lives now.
+    """
+
+    def __init__(self):
+        # size -> path of the only file seen, or {partial hash: [paths]}
+        self.by_size = {}
+        # path -> (category, AI name or None)
+        self.decisions = {}
+
+    def same_content(self, a, b):
+        try:
+            return os.path.samefile(a, b) or cache.content_hash(a) == cache.content_hash(b)
+        except OSError:
+            return False
+
+    def _groups(self, size):
+        entry = self.by_size[size]
+        if isinstance(entry, str):
+            try:
+                entry = {partial_hash(entry): [entry]}
+            except OSError:
+                entry = {}
+            self.by_size[size] = entry
+        return entry
+
+    def find(self, path, size):
+        """Return the path of an identical earlier file, or register this one"""
+        if size == 0:
+            return None
+        if size not in self.by_size:
+            self.by_size[size] = path
+            return None
+        groups = self._groups(size)
+        try:
+            candidates = groups.setdefault(partial_hash(path), [])
+        except OSError:
+            return None
+        for other in candidates:
+            if self.same_content(other, path):
+                return other
+        candidates.append(path)
+        return None
+
+    def decided(self, path, category, name):
+        """Record the outcome for a registered file, for its later duplicates"""
+        self.decisions[path] = (category, name)
+
+    def decision(self, path):
+        return self.decisions.get(path)
+
+    def moved(self, size, old, new):
+        if old in self.decisions:
+            self.decisions[new] = self.decisions.pop(old)
+        entry = self.by_size.get(size)
+        if entry == old:
+            self.by_size[size] = new
+        elif isinstance(entry, dict):
+            try:
+                groups = [entry.get(partial_hash(new), [])]
+            except OSError:
+                groups = entry.values()
+            for candidates in groups:
+                if old in candidates:
+                    candidates[candidates.index(old)] = new
+                    return
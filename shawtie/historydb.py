@@ -0,0 +1,274 @@
+"""Append-only, indexed sort history backed by SQLite"""
+
+import json
+import secrets
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+path = Path.home() / ".smartsort_history.db"
+legacy_path = Path.home() / ".smartsort_history.json"
+
+_columns = ("dest", "original", "category", "timestamp", "ai_renamed", "session")
+_conn = None
+_lock = threading.Lock()
+
+
+def configure(path=None, legacy_path=None):
+    """Point the store at other files"""
+    with _lock:
+        _set(path, legacy_path)
+
+
+def _set(new_path, new_legacy_path):
+    global path, legacy_path, _conn
+    if new_path is not None:
+        path = Path(new_path)
+    if new_legacy_path is not None:
+        legacy_path = Path(new_legacy_path)
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(str(path), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.executescript(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY,"
+            " dest TEXT NOT NULL,"
+            " original TEXT,"
+            " category TEXT,"
+            " timestamp TEXT NOT NULL,"
+            " ai_renamed INTEGER NOT NULL DEFAULT 0,"
+            " session TEXT,"
+            " extra TEXT);"
+            "CREATE INDEX IF NOT EXISTS entries_dest ON entries(dest);"
+            "CREATE INDEX IF NOT EXISTS entries_original ON entries(original);"
+            "CREATE INDEX IF NOT EXISTS entries_timestamp ON entries(timestamp);"
+            "CREATE INDEX IF NOT EXISTS entries_session ON entries(session, id);"
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session TEXT PRIMARY KEY,"
+            " started TEXT NOT NULL,"
+            " source TEXT,"
+            " dest TEXT,"
+            " status TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS sessions_started ON sessions(started);"
+            "CREATE TABLE IF NOT EXISTS intents ("
+            " id INTEGER PRIMARY KEY,"
+            " session TEXT NOT NULL,"
+            " original TEXT NOT NULL,"
+            " dest TEXT NOT NULL,"
+            " info TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS intents_session ON intents(session);"
+        )
+        _migrate(_conn)
+    return _conn
+
+
+def _migrate(db):
+    # One-time import of the old monolithic JSON history.
+    if not legacy_path.exists():
+        return
+    try:
+        with open(legacy_path, "r") as f:
+            old = json.load(f)
+    except (OSError, ValueError):
+        return
+    with db:
+        for dest, info in old.items():
+            _insert(db, dest, info)
+    legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
+
+
+def _insert(db, dest, info):
+    extra = {k: v for k, v in info.items() if k not in _columns}
+    db.execute(
+        "INSERT INTO entries (dest, original, category, timestamp, ai_renamed, session, extra)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            dest,
+            info.get("original"),
+            info.get("category"),
+            info.get("timestamp") or datetime.now().isoformat(),
+            int(bool(info.get("ai_renamed", False))),
+            info.get("session"),
+            json.dumps(extra) if extra else None,
+        ),
+    )
+
+
+def _row(row):
+    entry = dict(zip(_columns, row[:6]))
+    entry["ai_renamed"] = bool(entry["ai_renamed"])
+    if row[6]:
+        entry.update(json.loads(row[6]))
+    return entry
+
+
+_select = "SELECT dest, original, category, timestamp, ai_renamed, session, extra FROM entries"
+
+
+def new_session():
+    """Identifier recorded with every entry written by one sort run"""
+    return datetime.now().strftime("%Y%m%d-%H%M%S-") + secrets.token_hex(2)
+
+
+def begin_session(source, dest):
+    """Register a new sort run and return its session id"""
+    session = new_session()
+    with _lock:
+        db = _db()
+        with db:
+            db.execute(
+                "INSERT INTO sessions (session, started, source, dest, status) VALUES (?, ?, ?, ?, ?)",
+                (session, datetime.now().isoformat(), str(source), str(dest), "running"),
+            )
+    return session
+
+
+def set_status(session, status):
+    with _lock:
+        db = _db()
+        with db:
+            db.execute("UPDATE sessions SET status = ? WHERE session = ?", (status, session))
+
+
+def last_session():
+    """Most recent session that still has entries to undo"""
+    with _lock:
+        row = _db().execute(
+            "SELECT session FROM sessions s WHERE status != 'undone' AND EXISTS"
+            " (SELECT 1 FROM entries e WHERE e.session = s.session)"
+            " ORDER BY started DESC LIMIT 1"
+        ).fetchone()
+    return row[0] if row else None
+
+
+def resolve_session(prefix):
+    """Full session id for an exact id or unique prefix, else None"""
+    with _lock:
+        rows = _db().execute(
+            "SELECT session FROM sessions WHERE session >= ? AND session < ? LIMIT 2", (prefix, prefix + "~")
+        ).fetchall()
+    return rows[0][0] if len(rows) == 1 else None
+
+
+def sessions(limit=50):
+    """(session, started, source, status, files, renamed) tuples, newest first"""
+    with _lock:
+        return _db().execute(
+            "SELECT s.session, s.started, s.source, s.status,"
+            " (SELECT COUNT(*) FROM entries e WHERE e.session = s.session),"
+            " (SELECT COALESCE(SUM(ai_renamed), 0) FROM entries e WHERE e.session = s.session)"
+            " FROM sessions s ORDER BY s.started DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+
+def by_session(session):
+    with _lock:
+        rows = _db().execute(_select + " WHERE session = ? ORDER BY id", (session,)).fetchall()
+    return [_row(r) for r in rows]
+
+
+def begin_move(session, original, dest, info):
+    """Write-ahead record of a move that is about to happen; returns its id"""
+    with _lock:
+        db = _db()
+        with db:
+            cur = db.execute(
+                "INSERT INTO intents (session, original, dest, info) VALUES (?, ?, ?, ?)",
+                (session, str(original), str(dest), json.dumps(info)),
+            )
+    return cur.lastrowid
+
+
+def finish_move(intent_id, dest, info):
+    """Turn a completed intent into a history entry in one transaction"""
+    with _lock:
+        db = _db()
+        with db:
+            _insert(db, str(dest), info)
+            db.execute("DELETE FROM intents WHERE id = ?", (intent_id,))
+
+
+def drop_intent(intent_id):
+    with _lock:
+        db = _db()
+        with db:
+            db.execute("DELETE FROM intents WHERE id = ?", (intent_id,))
+
+
+def intents(session):
+    """(id, original, dest, info) for moves that were started but not confirmed"""
+    with _lock:
+        rows = _db().execute(
+            "SELECT id, original, dest, info FROM intents WHERE session = ? ORDER BY id", (session,)
+        ).fetchall()
+    return [(i, o, d, json.loads(info)) for i, o, d, info in rows]
+
+
+def resumable_session(source, dest):
+    """Latest unfinished session that sorted source into dest, or None"""
+    with _lock:
+        row = _db().execute(
+            "SELECT session FROM sessions WHERE source = ? AND dest = ?"
+            " AND status IN ('running', 'interrupted') ORDER BY started DESC LIMIT 1",
+            (str(source), str(dest)),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def remove(dest):
+    with _lock:
+        db = _db()
+        with db:
+            db.execute("DELETE FROM entries WHERE dest = ?", (str(dest),))
+
+
+def since(last_id, chunk=5000):
+    """Yield (id, original, category) for entries newer than last_id"""
+    while True:
+        with _lock:
+            rows = _db().execute(
+                "SELECT id, original, category FROM entries WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk)
+            ).fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def latest_timestamp():
+    with _lock:
+        row = _db().execute("SELECT MAX(timestamp) FROM entries").fetchone()
+    return row[0]
+
+
+def on_date(date):
+    """Entries whose ISO timestamp falls on the given YYYY-MM-DD date"""
+    with _lock:
+        rows = _db().execute(
+            _select + " WHERE timestamp >= ? AND timestamp < ? ORDER BY id", (date, date + "~")
+        ).fetchall()
+    return [_row(r) for r in rows]
+
+
+def daily_summary():
+    """(date, files, renamed) tuples, newest first"""
+    with _lock:
+        return _db().execute(
+            "SELECT substr(timestamp, 1, 10) AS day, COUNT(*), SUM(ai_renamed) FROM entries"
+            " GROUP BY day ORDER BY day DESC"
+        ).fetchall()
+
+
+def count():
+    with _lock:
+        return _db().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
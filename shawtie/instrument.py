@@ -0,0 +1,203 @@
+"""Per-stage timers, counters and the --profile report"""
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from rich import box
+from rich.table import Table
+
+# Upper bounds in seconds; the last bucket catches everything slower.
+buckets = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; memory stays constant however many samples"""
+
+    def __init__(self):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(buckets) and seconds > buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding rank q"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = buckets[i - 1] if i else 0.0
+                hi = buckets[i] if i < len(buckets) else self.max
+                return min(self.max, lo + (hi - lo) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else None,
+            "p50": _round(self.quantile(0.5)),
+            "p90": _round(self.quantile(0.9)),
+            "p99": _round(self.quantile(0.99)),
+            "max": round(self.max, 6),
+            "buckets": dict(zip([str(b) for b in buckets] + ["+Inf"], self.counts)),
+        }
+
+
+def _round(v):
+    return None if v is None else round(v, 6)
+
+
+stages = {}
+models = {}
+counters = {}
+model_counters = {}
+# (outcome, category) -> files; outcome is sorted, skipped or errored.
+files = {}
+
+
+def observe(stage, seconds, model=None):
+    with _lock:
+        hist = stages.get(stage)
+        if hist is None:
+            hist = stages[stage] = Histogram()
+        hist.observe(seconds)
+        if model:
+            hist = models.get(model)
+            if hist is None:
+                hist = models[model] = Histogram()
+            hist.observe(seconds)
+
+
+def add(name, n=1, model=None):
+    with _lock:
+        counters[name] = counters.get(name, 0) + n
+        if model:
+            per = model_counters.setdefault(model, {})
+            per[name] = per.get(name, 0) + n
+
+
+def count_file(outcome, category=None, size=0):
+    with _lock:
+        key = (outcome, category or "unknown")
+        files[key] = files.get(key, 0) + 1
+        if outcome == "sorted":
+            counters["bytes_moved"] = counters.get("bytes_moved", 0) + size
+
+
+@contextmanager
+def timer(stage, model=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, model)
+
+
+def timed(stage):
+    """Decorator recording every call of the function under stage"""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def timed_iter(stage, iterable):
+    """Yield from iterable, timing each step (for generators such as the scan)"""
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            observe(stage, time.perf_counter() - start)
+            return
+        observe(stage, time.perf_counter() - start)
+        yield item
+
+
+def reset():
+    with _lock:
+        stages.clear()
+        models.clear()
+        counters.clear()
+        model_counters.clear()
+        files.clear()
+
+
+def snapshot():
+    """Everything collected so far as plain JSON-serialisable data"""
+    from . import cache
+    with _lock:
+        data = {
+            "stages": {name: h.to_dict() for name, h in stages.items()},
+            "models": {name: dict(h.to_dict(), **model_counters.get(name, {})) for name, h in models.items()},
+            "counters": dict(counters),
+            "files": [{"outcome": o, "category": c, "count": n} for (o, c), n in sorted(files.items())],
+        }
+    data["cache"] = cache.stats()
+    return data
+
+
+def to_json(path=None):
+    text = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    return text
+
+
+def _ms(v):
+    return "-" if v is None else f"{v * 1000:.1f}"
+
+
+def show_profile(console):
+    data = snapshot()
+    tab = Table(title="Profile", box=box.ROUNDED, show_header=True, header_style="bold magenta")
+    tab.add_column("Stage", style="cyan")
+    tab.add_column("Calls", justify="right")
+    tab.add_column("Total s", justify="right", style="green")
+    tab.add_column("Mean ms", justify="right")
+    tab.add_column("p50 ms", justify="right")
+    tab.add_column("p99 ms", justify="right")
+    tab.add_column("Max ms", justify="right")
+    rows = sorted(data["stages"].items(), key=lambda kv: -kv[1]["total"])
+    rows += sorted((f"ai {name}", h) for name, h in data["models"].items())
+    for name, h in rows:
+        tab.add_row(name, str(h["count"]), f"{h['total']:.2f}", _ms(h["mean"]), _ms(h["p50"]),
+                    _ms(h["p99"]), _ms(h["max"]))
+    console.print(tab)
+    c = data["counters"]
+    cache_stats = data["cache"]
+    console.print(
+        f"[bold]Bytes read:[/bold] {c.get('bytes_read', 0):,}  "
+        f"[bold]Uploaded:[/bold] {c.get('bytes_uploaded', 0):,}  "
+        f"[bold]AI requests:[/bold] {c.get('requests', 0)}  "
+        f"[bold]Retries:[/bold] {c.get('retries', 0)}  "
+        f"[bold]Throttled:[/bold] {c.get('throttled', 0)}  "
+        f"[bold]Cache hits:[/bold] {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}"
+    )
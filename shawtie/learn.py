@@ -0,0 +1,119 @@
+"""Naive Bayes classifier trained from sort history to pre-empt the LLM"""
+
+import json
+import math
+import os
+import re
+from pathlib import Path
+
+from . import historydb
+
+path = Path.home() / ".smartsort_model.json"
+threshold = 0.9
+min_samples = 50
+
+_token = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+
+def features(file_path):
+    """Filename tokens, extension and parent directory name"""
+    name = os.path.basename(file_path)
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    feats = ["tok:" + t.lower() for t in _token.findall(stem) if 2 <= len(t) <= 30 and not t.isdigit()]
+    if any(t.isdigit() for t in _token.findall(stem)):
+        feats.append("has:digits")
+    feats.append("ext:" + ext.lower())
+    parent = os.path.basename(os.path.dirname(file_path)).lower()
+    if parent:
+        feats.append("dir:" + parent)
+    return feats
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes with add-one smoothing over filename features"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.trained_upto = data.get("trained_upto", 0)
+        self.docs = data.get("docs", {})
+        self.counts = data.get("counts", {})
+        self.totals = {cat: sum(c.values()) for cat, c in self.counts.items()}
+        self.vocab = set()
+        for c in self.counts.values():
+            self.vocab.update(c)
+
+    @property
+    def samples(self):
+        return sum(self.docs.values())
+
+    def learn(self, file_path, category):
+        self.docs[category] = self.docs.get(category, 0) + 1
+        counts = self.counts.setdefault(category, {})
+        for feat in features(file_path):
+            counts[feat] = counts.get(feat, 0) + 1
+            self.totals[category] = self.totals.get(category, 0) + 1
+            self.vocab.add(feat)
+
+    def predict(self, file_path):
+        """(category, posterior probability), or (None, 0.0) when untrained"""
+        if not self.docs:
+            return None, 0.0
+        feats = features(file_path)
+        n_docs = self.samples
+        v = len(self.vocab) + 1
+        logp = {}
+        for cat, docs in self.docs.items():
+            counts = self.counts.get(cat, {})
+            denom = self.totals.get(cat, 0) + v
+            lp = math.log(docs / n_docs)
+            for feat in feats:
+                lp += math.log((counts.get(feat, 0) + 1) / denom)
+            logp[cat] = lp
+        best = max(logp, key=logp.get)
+        top = logp[best]
+        norm = sum(math.exp(lp - top) for lp in logp.values())
+        return best, 1.0 / norm
+
+    def to_dict(self):
+        return {"trained_upto": self.trained_upto, "docs": self.docs, "counts": self.counts}
+
+
+def load():
+    if path.exists():
+        try:
+            with open(path, "r") as f:
+                return NaiveBayes(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return NaiveBayes()
+
+
+def save(model):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(model.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def train(model, categories=None):
+    """Learn from history entries added since the last training; returns how many"""
+    learned = 0
+    for entry_id, original, category in historydb.since(model.trained_upto):
+        model.trained_upto = entry_id
+        if not original or not category or (categories is not None and category not in categories):
+            continue
+        model.learn(original, category)
+        learned += 1
+    return learned
+
+
+def classify(model, file_path):
+    """Confident prediction for file_path, or None to defer to the LLM"""
+    if model is None or model.samples < min_samples:
+        return None
+    cat, confidence = model.predict(file_path)
+    if confidence < threshold:
+        return None
+    return cat, confidence
@@ -1,10 +1,15 @@
 import os
 import base64
+import io
 import json
 import requests
 import shutil
+import subprocess
 import argparse
 import time
+from collections import deque
+from itertools import chain
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 from datetime import datetime
 from pydub import AudioSegment
@@ -14,21 +19,32 @@ from rich.table import Table
 from rich.panel import Panel
 from rich import box
 from rich.tree import Tree
-from PIL import Image
+from PIL import Image, ImageOps
 from PIL.ExifTags import TAGS
 import mimetypes
+from . import cache, client, historydb, instrument, learn, metaindex, provider, ruleset
+from .dedupe import DuplicateIndex
+from .ruleset import compile_rules
+from .sniff import sniff_file
 
 console = Console()
 
-api_url = "https://ai.hackclub.com/proxy/v1/chat/completions"
-api_key = "sk-hc-v1-92624fcb92464305a0461b27bd661b0514a787f5948f4938b3f7c077d9ea7fa7"
+backend = provider.load()
+llm = backend.model("llm")
+vlm = backend.model("vlm")
 
-llm = "qwen/qwen3-32b"
-vlm = "qwen/qwen3-vl-235b-a22b-instruct"
+# Bump an entry whenever its prompt changes so stale cache entries are ignored.
+prompt_versions = {"vlm": 1, "audio": 1, "text": 1, "analyze": 1}
+
+thumb_max_edge = 768
+thumb_format = "JPEG"
+thumb_quality = 80
+
+categories = ["Images", "Videos", "Audio", "Docs", "Code", "Archives", "Misc"]
+batch_excerpt = 600
 
 home = Path.home()
 rules = home / ".smartsort_rules.json"
-history = home / ".smartsort_history.json"
 
 default = {
     "Images": ["jpg","jpeg","png","gif","webp","tiff","bmp","svg"],
@@ -42,6 +58,7 @@ default = {
 
 junk_pattern = ["thumbs.db", "desktop.ini", ".DS_Store"]
 junk_ext = ["tmp","crdownload","log"]
+ignore_dirs = [".git", ".hg", ".svn"]
 
 def load_rules():
     if rules.exists():
@@ -54,17 +71,6 @@ def save_rules(rules_dict):
     with open(rules, "w") as f:
         json.dump(rules_dict, f, indent=4)
 
-def load_history():
-    if history.exists():
-        with open(history, "r") as f:
-            return json.load(f)
-    else:
-        return {}
-
-def save_history(history_dict):
-    with open(history, "w") as f:
-        json.dump(history_dict, f, indent=4)
-
 def human_size(size, decimal_places=2):
     for unit in ['B','KB','MB','GB','TB']:
         if size < 1024.0:
@@ -78,106 +84,168 @@ def clean_filename(name):
         name = name.replace(char, '_')
     return name.strip()
 
-def partial_hash(file_path, num_bytes=1024):
-    hasher = base64.b64encode
-    with open(file_path, 'rb') as f:
-        data = f.read(num_bytes)
-        return hasher(data).decode('utf-8')
-    
 def ensure_dir(path):
     if not path.exists():
         path.mkdir(parents=True, exist_ok=True)
 
-def deterministic_category(path, rules):
-    name = os.path.basename(path).lower()
-    ext = name.split(".")[-1] if "." in name else ""
-    size = 0
-    try:
-        size = os.path.getsize(path)
-    except Exception:
-        pass
-    scores = {cat:0 for cat in rules.keys()}
-    for cat, exts in rules.items():
-        if ext and ext in exts:
-            scores[cat] += 10
-    if any(k in name for k in ("screenshot","screen","img","photo")):
-        scores["Images"] += 4 if "Images" in scores else 0
-    if any(k in name for k in ("invoice","bill","receipt")):
-        scores["Docs"] += 5 if "Docs" in scores else 0
-    if size > 50_000_000 and "Videos" in scores:
-        scores["Videos"] += 4
-    best = max(scores.items(), key=lambda kv: kv[1])
-    return best[0], scores
+def scan_files(root, recursive=True, exclude=()):
+    # Depth-first os.scandir walk yielding DirEntry objects as they are found.
+    # Excluded and ignored directories are pruned before being opened, and
+    # entries carry cached d_type/stat so callers don't need extra syscalls.
+    excluded = {os.fspath(p) for p in exclude}
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        subdirs = []
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        if (recursive and not entry.is_symlink() and entry.name not in ignore_dirs
+                                and entry.path not in excluded):
+                            subdirs.append(entry.path)
+                        continue
+                    if not recursive and not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                yield entry
+        stack.extend(reversed(subdirs))
+
+def deterministic_category(path, rules, st=None):
+    return compile_rules(rules).score(path, st)
+
+def use_provider(p):
+    global backend, llm, vlm
+    backend = p
+    llm = p.model("llm")
+    vlm = p.model("vlm")
 
 def ai(model,message):
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    body = {
-        "model": model,
-        "messages": message
-    }
-    
     try:
-        r = requests.post(api_url, headers=headers, json=body, timeout=30)
-        r.raise_for_status()
-        response = r.json()
-        if isinstance(response, dict):
-            return response["choices"][0]["message"]["content"].strip()
-        return str(response).strip()
-    
+        return backend.complete(model, message)
     except requests.exceptions.RequestException as e:
         raise Exception(e)
 
-def classify_llm(path):
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            txt = f.read(4000)
-    except Exception:
-        txt = None
-
+@instrument.timed("classify_batch")
+def classify_batch(paths):
+    # Same answers as analyze_text (category and name), for many files in one
+    # request; they share its cache entries.
+    results = {}
+    todo = []
+    for path in paths:
+        hit = cache.get("analyze", path, llm, prompt_versions["analyze"], os.path.basename(path))
+        if hit is not None:
+            results[path] = hit
+        else:
+            todo.append(path)
+    if not todo:
+        return results
     prompt = (
-        "You are a file classification assistant. "
-        "Given the filename and a short text excerpt, return ONE best category from this list:\n"
-        "- Images\n- Videos\n- Audio\n- Docs\n- Code\n- Archives\n- Misc\n"
-        "Return only the single category name and nothing else.\n\n"
-        f"Filename: {os.path.basename(path)}\n"
+        "You are a file classification and naming assistant. "
+        "For each numbered file below (filename and a short text excerpt), pick ONE best category from this list:\n"
+        + "".join(f"- {c}\n" for c in categories) +
+        "and suggest a SHORT descriptive filename (2-4 words max, no extension) based on the content.\n"
+        "Return only a JSON object mapping each file number to its category and name, for example "
+        '{"1": {"category": "Docs", "name": "quarterly sales report"}, "2": {"category": "Code", "name": "csv parser"}}, '
+        "and nothing else.\n\n"
     )
-    if txt:
-        prompt += f"Text excerpt:\n{txt}\n"
-
-    messages = [{"role":"user","content":prompt}]
+    for i, path in enumerate(todo, 1):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                txt = f.read(batch_excerpt)
+            instrument.add("bytes_read", len(txt))
+        except Exception:
+            txt = None
+        prompt += f"[{i}] Filename: {os.path.basename(path)}\n"
+        if txt:
+            prompt += f"Text excerpt:\n{txt}\n"
+        prompt += "\n"
     try:
-        out = ai(llm, messages)
-        if not out or len(out.strip()) == 0:
-            return None
-        lines = out.splitlines()
-        if not lines:
-            return None
-        out = lines[0].strip()
-        out = out.split(".")[0].strip()
-        return out
+        out = ai(llm, [{"role":"user","content":prompt}])
     except Exception as e:
         print(e)
-        return None
+        return results
+    for i, (cat, name) in parse_batch_answer(out).items():
+        result = analysis(cat, name)
+        if 1 <= i <= len(todo) and result:
+            path = todo[i - 1]
+            results[path] = result
+            cache.put("analyze", path, llm, prompt_versions["analyze"], result, os.path.basename(path))
+    return results
+
+def parse_batch_answer(out):
+    # {number: (category, name or None)}
+    answers = {}
+    if not out:
+        return answers
+    start, end = out.find("{"), out.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(out[start:end + 1])
+            for k, v in data.items():
+                if isinstance(v, dict):
+                    answers[int(str(k).strip("[] "))] = (v.get("category"), v.get("name"))
+                else:
+                    answers[int(str(k).strip("[] "))] = (v, None)
+            return answers
+        except (ValueError, AttributeError):
+            pass
+    # Fall back to "1: Docs" / "[1] Docs" style lines.
+    for line in out.splitlines():
+        line = line.strip().lstrip("-*[ ")
+        num = ""
+        while line and line[0].isdigit():
+            num += line[0]
+            line = line[1:]
+        if num:
+            answers[int(num)] = (line.strip(" ]:.-=)\"'"), None)
+    return answers
+
+@instrument.timed("thumbnail")
+def image_thumbnail(path, max_edge=None):
+    max_edge = max_edge or thumb_max_edge
+    instrument.add("bytes_read", os.path.getsize(path))
+    with Image.open(path) as img:
+        # draft() lets the JPEG decoder scale by 1/2..1/8 while decoding.
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGBA") if thumb_format == "WEBP" and "A" in img.getbands() else img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format=thumb_format, quality=thumb_quality)
+    return f"image/{thumb_format.lower()}", buf.getvalue()
 
+@instrument.timed("rename_vlm")
 def rename_vlm(path):
+    thumb_key = f"{thumb_format}:{thumb_max_edge}"
+    hit = cache.get("vlm", path, vlm, prompt_versions["vlm"], thumb_key)
+    if hit is not None:
+        return hit
     try:
-        ext = os.path.basename(path).split(".")[-1].lower() if "." in os.path.basename(path) else ""
-        mime_types = {
-            "jpg": "image/jpeg",
-            "jpeg": "image/jpeg",
-            "png": "image/png",
-            "gif": "image/gif",
-            "webp": "image/webp",
-            "bmp": "image/bmp",
-            "svg": "image/svg+xml"
-        }
-        mime_type = mime_types.get(ext, "image/jpeg")
-        with open(path, "rb") as f:
-            b = f.read(500000)
-            b64 = base64.b64encode(b).decode()
+        try:
+            mime_type, b = image_thumbnail(path)
+        except Exception:
+            # Formats Pillow can't decode (e.g. SVG) are sent as-is.
+            ext = os.path.basename(path).split(".")[-1].lower() if "." in os.path.basename(path) else ""
+            mime_types = {
+                "jpg": "image/jpeg",
+                "jpeg": "image/jpeg",
+                "png": "image/png",
+                "gif": "image/gif",
+                "webp": "image/webp",
+                "bmp": "image/bmp",
+                "svg": "image/svg+xml"
+            }
+            mime_type = mime_types.get(ext, "image/jpeg")
+            with open(path, "rb") as f:
+                b = f.read(500000)
+            instrument.add("bytes_read", len(b))
+        b64 = base64.b64encode(b).decode()
         messages = [
             {
                 "role": "user",
@@ -207,19 +275,54 @@ def rename_vlm(path):
             out = out.split(".")[0].strip()
         if len(out) < 2 or len(out) > 100:
             return None
+        cache.put("vlm", path, vlm, prompt_versions["vlm"], out, thumb_key)
         return out
     except Exception as e:
         print(e)
         return None
 
+@instrument.timed("probe_audio")
+def probe_audio(path, decode=True):
+    try:
+        import mutagen
+        info = mutagen.File(path).info
+        props = {
+            "duration": float(info.length),
+            "sample_rate": int(info.sample_rate),
+            "channels": int(info.channels),
+            "bits_per_sample": getattr(info, "bits_per_sample", None),
+            "bitrate": getattr(info, "bitrate", None),
+        }
+        if props["duration"] > 0 and props["sample_rate"] > 0 and props["channels"] > 0:
+            return props
+    except Exception:
+        if not decode:
+            raise
+    if not decode:
+        raise ValueError("no audio properties in file header")
+    # Header probe failed; decode the whole file as a last resort.
+    audio = AudioSegment.from_file(path)
+    return {
+        "duration": len(audio) / 1000.0,
+        "sample_rate": audio.frame_rate,
+        "channels": audio.channels,
+        "bits_per_sample": audio.sample_width * 8,
+        "bitrate": None,
+    }
+
+@instrument.timed("transcribe_audio")
 def transcribe_audio(path):
+    name = os.path.basename(path)
+    hit = cache.get("audio", path, llm, prompt_versions["audio"], name)
+    if hit is not None:
+        return hit
     try:
         try:
-            audio = AudioSegment.from_file(path)
-            duration_seconds = len(audio) / 1000.0
+            audio = probe_audio(path)
+            duration_seconds = audio["duration"]
             duration_str = f"{int(duration_seconds // 60)}m {int(duration_seconds % 60)}s"
-            sample_rate = audio.frame_rate
-            channels = audio.channels
+            sample_rate = audio["sample_rate"]
+            channels = audio["channels"]
             file_size = os.path.getsize(path)
             size_mb = file_size / (1024 * 1024)
             filename = os.path.basename(path)
@@ -253,6 +356,7 @@ def transcribe_audio(path):
                 renamed = renamed.split(".")[0].strip()
             if len(renamed) < 2 or len(renamed) > 100:
                 return None
+            cache.put("audio", path, llm, prompt_versions["audio"], renamed, name)
             return renamed
         except Exception as e:
             print(e)
@@ -299,10 +403,11 @@ def is_junk(path):
         return True
     return False
 
-def smart_rename(path, cat, use_ai=True):
+def smart_rename(path, cat, use_ai=True, ext=None):
     if not use_ai:
         return None
-    ext = os.path.basename(path).split(".")[-1].lower() if "." in os.path.basename(path) else ""
+    if ext is None:
+        ext = os.path.basename(path).split(".")[-1].lower() if "." in os.path.basename(path) else ""
     if cat == "Images" and ext in default["Images"]:
         renamed = rename_vlm(path)
         if renamed:
@@ -312,32 +417,206 @@ def smart_rename(path, cat, use_ai=True):
         if renamed:
             return renamed
     if cat in ["Docs", "Code"]:
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read(2000)
-            prompt = (
-                "You are a file naming assistant. "
-                "Based on the content below, suggest a SHORT descriptive filename (2-4 words max, no extension). "
-                "Return only the filename, nothing else.\n\n"
-                f"Content preview:\n{content[:1000]}\n"
-            )
-            messages = [{"role":"user","content":prompt}]
-            renamed = ai(llm, messages)
-            if not renamed or len(renamed.strip()) == 0:
-                return None
-            lines = renamed.splitlines()
-            if not lines:
-                return None
-            renamed = lines[0].strip().strip('"').strip("'")
-            if len(renamed) < 2 or len(renamed) > 100:
-                return None
-            return renamed
-        except Exception as e:
-            print(e)
-            return None
+        return rename_text(path)
     return None
 
-def sort_directory(source_dir, dest_dir=None, recursive=True, dry_run=False):
+@instrument.timed("rename_text")
+def rename_text(path):
+    hit = cache.get("text", path, llm, prompt_versions["text"])
+    if hit is not None:
+        return hit
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            content = f.read(2000)
+        instrument.add("bytes_read", len(content))
+        prompt = (
+            "You are a file naming assistant. "
+            "Based on the content below, suggest a SHORT descriptive filename (2-4 words max, no extension). "
+            "Return only the filename, nothing else.\n\n"
+            f"Content preview:\n{content[:1000]}\n"
+        )
+        messages = [{"role":"user","content":prompt}]
+        renamed = ai(llm, messages)
+        if not renamed or len(renamed.strip()) == 0:
+            return None
+        lines = renamed.splitlines()
+        if not lines:
+            return None
+        renamed = lines[0].strip().strip('"').strip("'")
+        if len(renamed) < 2 or len(renamed) > 100:
+            return None
+        cache.put("text", path, llm, prompt_versions["text"], renamed)
+        return renamed
+    except Exception as e:
+        print(e)
+        return None
+
+@instrument.timed("analyze_text")
+def analyze_text(path):
+    name = os.path.basename(path)
+    hit = cache.get("analyze", path, llm, prompt_versions["analyze"], name)
+    if hit is not None:
+        return hit
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            txt = f.read(4000)
+        instrument.add("bytes_read", len(txt))
+    except Exception:
+        txt = None
+    prompt = (
+        "You are a file classification and naming assistant. "
+        "Given the filename and a short text excerpt, pick ONE best category from this list:\n"
+        + "".join(f"- {c}\n" for c in categories) +
+        "and suggest a SHORT descriptive filename (2-4 words max, no extension) based on the content.\n"
+        'Return only a JSON object like {"category": "Docs", "name": "quarterly sales report"} and nothing else.\n\n'
+        f"Filename: {name}\n"
+    )
+    if txt:
+        prompt += f"Text excerpt:\n{txt}\n"
+    try:
+        out = ai(llm, [{"role":"user","content":prompt}])
+        start, end = out.find("{"), out.rfind("}")
+        data = json.loads(out[start:end + 1]) if start != -1 and end > start else {}
+    except Exception as e:
+        print(e)
+        return None
+    if not isinstance(data, dict):
+        return None
+    result = analysis(data.get("category"), data.get("name"))
+    if result is not None:
+        cache.put("analyze", path, llm, prompt_versions["analyze"], result, name)
+    return result
+
+def analysis(cat, renamed):
+    # Clean a model's (category, name) answer; None unless the category is valid.
+    cat = str(cat or "").strip().split(".")[0].strip()
+    if cat not in categories:
+        return None
+    renamed = str(renamed or "").splitlines()
+    renamed = renamed[0].strip().strip('"').strip("'") if renamed else ""
+    if "." in renamed:
+        renamed = renamed.split(".")[0].strip()
+    return {"category": cat, "name": renamed if 2 <= len(renamed) <= 100 else None}
+
+@instrument.timed("analyze")
+def analyze_file(path, rules_dict, use_ai=True, batch=None, st=None, model=None):
+    # Returns (category, ai name or None, extra history fields).
+    cat, scores = deterministic_category(path, rules_dict, st)
+    if scores[cat] < 10:
+        sniffed = sniff_file(path)
+        if sniffed and sniffed[1] in rules_dict:
+            kind, cat = sniffed
+            return cat, smart_rename(path, cat, use_ai, kind), {"detected_type": kind}
+        guess = learn.classify(model, path)
+        if guess and guess[0] in rules_dict:
+            cat = guess[0]
+            return cat, smart_rename(path, cat, use_ai), {"learned_confidence": round(guess[1], 3)}
+    if use_ai and scores[cat] < 10:
+        # One request answers both questions, batched or not; the name is only
+        # used for text categories, which is where smart_rename would ask again.
+        result = batch.result().get(path) if batch is not None else None
+        if result is None:
+            result = analyze_text(path)
+        ai_cat = result["category"] if result else None
+        if ai_cat and ai_cat in rules_dict and ai_cat in ["Docs", "Code"] and result["name"]:
+            return ai_cat, result["name"], {}
+        if ai_cat and ai_cat in rules_dict:
+            cat = ai_cat
+    renamed = smart_rename(path, cat, use_ai)
+    return cat, renamed, {}
+
+def target_path(f, cat, renamed, dest, taken=None):
+    # With taken (a set of planned paths) nothing is created on disk and
+    # those paths count as occupied, so a whole plan can be resolved upfront.
+    target_dir = dest / cat
+    if taken is None:
+        ensure_dir(target_dir)
+    ext = f.suffix
+    if renamed:
+        clean_name = clean_filename(renamed)
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        base_name = f"{clean_name}_{timestamp}{ext}"
+    else:
+        base_name = f"{f.stem}_{datetime.now().strftime('%Y%m%d%H%M%S')}{ext}"
+    dest_file = target_dir / base_name
+    counter = 1
+    while dest_file.exists() or (taken is not None and str(dest_file) in taken):
+        if renamed:
+            clean_name = clean_filename(renamed)
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            base_name = f"{clean_name}_{timestamp}_{counter}{ext}"
+        else:
+            base_name = f"{f.stem}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{counter}{ext}"
+        dest_file = target_dir / base_name
+        counter += 1
+    if taken is not None:
+        taken.add(str(dest_file))
+    return dest_file
+
+def commit_move(f, cat, renamed, dest, session, extra=None, dest_file=None):
+    dest_file = dest_file or target_path(f, cat, renamed, dest)
+    info = {
+        "original": str(f),
+        "category": cat,
+        "timestamp": datetime.now().isoformat(),
+        "ai_renamed": renamed is not None,
+        "session": session
+    }
+    if extra:
+        info.update(extra)
+    st = os.stat(f)
+    # The source's size and mtime let reconcile_journal tell a partial copy
+    # of it from a file that was later re-created at the same path.
+    journaled = dict(info, source_size=st.st_size, source_mtime_ns=st.st_mtime_ns)
+    with instrument.timer("journal"):
+        intent = historydb.begin_move(session, f, dest_file, journaled)
+    with instrument.timer("move"):
+        shutil.move(str(f), str(dest_file))
+    with instrument.timer("journal"):
+        historydb.finish_move(intent, dest_file, info)
+    return dest_file
+
+def reconcile_journal(session):
+    # Settle moves that were journaled but never confirmed: if the file made
+    # it to its destination the history entry is written, otherwise the
+    # intent is dropped and the file is picked up again by the scan.
+    recovered = 0
+    for intent_id, original, dest_file, info in historydb.intents(session):
+        size = info.pop("source_size", None)
+        mtime_ns = info.pop("source_mtime_ns", None)
+        try:
+            dest_st = os.stat(dest_file)
+        except OSError:
+            historydb.drop_intent(intent_id)
+            continue
+        try:
+            origin_st = os.stat(original)
+        except OSError:
+            historydb.finish_move(intent_id, dest_file, info)
+            recovered += 1
+            continue
+        if size is None or os.path.samestat(origin_st, dest_st):
+            pass
+        elif (origin_st.st_size, origin_st.st_mtime_ns) == (size, mtime_ns) and dest_st.st_size <= size:
+            # The source is untouched: a cross-filesystem move stopped between
+            # copy and unlink, and the destination is our (partial) copy.
+            try:
+                os.remove(dest_file)
+            except OSError as e:
+                console.print(f"[yellow]Could not remove partial copy {dest_file}: {e}[/yellow]")
+        elif dest_st.st_size == size:
+            # The move completed and a new file has since appeared at the
+            # original path; keep both and record the move.
+            historydb.finish_move(intent_id, dest_file, info)
+            recovered += 1
+            continue
+        else:
+            console.print(f"[yellow]Left {dest_file} in place: it doesn't match {original}[/yellow]")
+        historydb.drop_intent(intent_id)
+    return recovered
+
+def sort_directory(source_dir, dest_dir=None, recursive=True, dry_run=False, workers=1, batch_size=1,
+                   duplicates="sort", resume=False, use_model=False, preview_ai=False, plan=None):
     source = Path(source_dir).resolve()
     if dest_dir:
         dest = Path(dest_dir).resolve()
@@ -346,127 +625,267 @@ def sort_directory(source_dir, dest_dir=None, recursive=True, dry_run=False):
     if not source.exists():
         return    
     
-    rules_dict = load_rules()
-    hist = load_history()
-    if recursive:
-        files = []
-        for root, dirs, filenames in os.walk(source):
-            root_path = Path(root)
-            if dest in root_path.parents or root_path == dest:
-                continue
-            for filename in filenames:
-                files.append(root_path / filename)
-    else:
-        files = [f for f in source.iterdir() if f.is_file()]
-    
-    if not files:
+    workers = max(1, int(workers or 1))
+    batch_size = max(1, int(batch_size or 1))
+    if workers > client.pool_size:
+        client.configure(pool_size=workers)
+    rules_dict = compile_rules(load_rules())
+    model = None
+    if use_model:
+        model = learn.load()
+        if learn.train(model, rules_dict):
+            learn.save(model)
+    files = instrument.timed_iter("scan", scan_files(source, recursive, exclude=[dest]))
+    first = next(files, None)
+    if first is None:
         return
+    files = chain([first], files)
     
+    cache.reset_stats()
+    # A dry run walks the same pipeline but prints instead of moving. With
+    # preview_ai the AI answers it shows land in the cache, so the real run
+    # that follows repeats them without new requests.
+    use_ai = not dry_run or preview_ai
+    session = historydb.resumable_session(source, dest) if resume and not dry_run else None
     if dry_run:
-        console.print(f"\n[bold yellow]🔍 DRY RUN MODE - No files will be moved[/bold yellow]\n")
-        preview_table = Table(title="Preview of Changes", box=box.ROUNDED, show_header=True)
-        preview_table.add_column("File", style="cyan", no_wrap=False)
-        preview_table.add_column("→", style="white", justify="center")
-        preview_table.add_column("Category", style="green")
-        preview_table.add_column("New Location", style="yellow", no_wrap=False)
-        
-        for f in files[:50]:
-            if is_junk(str(f)):
-                continue
-            cat, scores = deterministic_category(str(f), rules_dict)
-            target_dir = dest / cat
-            preview_table.add_row(
-                f.name,
-                "→",
-                cat,
-                str(target_dir.relative_to(source))
-            )
-        
-        console.print(preview_table)
-        
-        total_files = len([f for f in files if not is_junk(str(f))])
-        total_size = sum(f.stat().st_size for f in files if not is_junk(str(f)))
-        
-        console.print(f"\n[bold]Summary:[/bold]")
-        console.print(f"  Total files to sort: [cyan]{total_files}[/cyan]")
-        console.print(f"  Total size: [cyan]{human_size(total_size)}[/cyan]")
-        console.print(f"  Destination: [cyan]{dest}[/cyan]")
-        console.print(f"\n[yellow]💡 Run without --dry-run to actually move files[/yellow]\n")
-        return
-    
+        console.print(f"\n[bold yellow]🔍 DRY RUN MODE - No files will be moved[/bold yellow]"
+                      f"{'' if preview_ai else ' [dim](AI decisions not included; add --preview-ai)[/dim]'}\n")
+    elif session:
+        recovered = reconcile_journal(session)
+        historydb.set_status(session, "running")
+        console.print(f"[cyan]Resuming session[/cyan] [bold]{session}[/bold]"
+                      f" [dim]({recovered} interrupted moves recovered)[/dim]")
+    else:
+        if resume:
+            console.print("[yellow]No interrupted run found for this folder; starting a new one.[/yellow]")
+        session = historydb.begin_session(source, dest)
     stats = {
         "sorted": 0,
         "skipped": 0,
         "errors": 0,
         "by_category": {},
         "ai_renamed": 0,
-        "total_size": 0
+        "total_size": 0,
+        "duplicates": 0,
+        "sniffed": 0,
+        "learned": 0
     }
+    dupes = DuplicateIndex() if duplicates != "off" else None
+    reported = []
     with Progress(SpinnerColumn(),TextColumn("[prog.description]{task.description}"),BarColumn(),TextColumn("[prog.percentage]{task.percentage:>3.0f}%"),TextColumn("•"),TextColumn("[cyan]{task.completed}/{task.total}[/cyan]"),TextColumn("•"),TimeElapsedColumn(),TextColumn("•"),TimeRemainingColumn(),console=console) as prog:
 
-        task = prog.add_task("[cyan]Sorting files...", total=len(files))
-        for f in files:
+        task = prog.add_task("[cyan]Sorting files...", total=0)
+        # AI work fans out over the pool; results are consumed in submission
+        # order so moves, history and progress stay on this thread.
+        # Ambiguous files are held back and classified batch_size at a time;
+        # their slot in `pending` is filled once the batch is submitted.
+        # Duplicates never get a future: they reuse the first copy's result,
+        # which is always finished before them. Items are only reachable from
+        # `pending` (and `waiting`, by path), so memory stays flat however
+        # large the tree; the duplicate index keeps just path strings.
+        pending = deque()
+        waiting = {}
+        window = workers * 4 + batch_size
+        batch = []
+
+        def sorted_copy(first_path):
+            # A finished first copy is only known by its path (where it ended
+            # up, or its source in a dry run) and the category and name the
+            # index recorded for it, so no AI call is needed.
+            placed = first_path
+            if dry_run:
+                placed = plan.planned.get(first_path) if plan is not None else None
+            decision = dupes.decision(first_path)
+            result = (decision[0], decision[1], {}) if decision else None
+            return {"file": Path(first_path), "dest": placed, "result": result}
+
+        def finish(item):
+            f = item["file"]
             try:
                 file_display = f.name[:40] + "..." if len(f.name) > 40 else f.name
                 prog.update(task, description=f"[cyan]Sorting:[/cyan] [yellow]{file_display}[/yellow]")
-                if is_junk(str(f)):
+                first = item["dup_of"]
+                if first is not None:
+                    stats["duplicates"] += 1
+                    result = first["result"] or analyze_file(str(f), rules_dict, use_ai, model=model)
+                else:
+                    result = item["future"].result()
+                item["result"] = result
+                cat, renamed, extra = result
+                extra = dict(extra)
+                if first is None and dupes is not None:
+                    dupes.decided(str(f), cat, renamed)
+                if first is not None and duplicates == "report":
+                    reported.append((str(f), first["dest"] or str(first["file"])))
                     stats["skipped"] += 1
+                    instrument.count_file("skipped", cat)
+                    if plan is not None:
+                        plan.skip(f, "duplicate", first["dest"] or str(first["file"]))
+                    if dry_run:
+                        console.print(f"  [dim]{f.relative_to(source)} left in place "
+                                      f"(duplicate of {first['file'].name})[/dim]")
                     prog.advance(task)
-                    continue
-                try:
-                    stats["total_size"] += f.stat().st_size
-                except:
-                    pass
-                cat, scores = deterministic_category(str(f), rules_dict)
-                if scores[cat] < 10:
-                    ai_cat = classify_llm(str(f))
-                    if ai_cat and ai_cat in rules_dict:
-                        cat = ai_cat
-                renamed = smart_rename(str(f), cat)
+                    return
+                if first is not None and duplicates == "quarantine":
+                    cat = "Duplicates"
                 if renamed:
                     stats["ai_renamed"] += 1
-                target_dir = dest / cat
-                ensure_dir(target_dir)
-                ext = f.suffix
-                if renamed:
-                    clean_name = clean_filename(renamed)
-                    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                    base_name = f"{clean_name}_{timestamp}{ext}"
-                else:
-                    base_name = f"{f.stem}_{datetime.now().strftime('%Y%m%d%H%M%S')}{ext}"
-                dest_file = target_dir / base_name
-                counter = 1
-                while dest_file.exists():
-                    if renamed:
-                        clean_name = clean_filename(renamed)
-                        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                        base_name = f"{clean_name}_{timestamp}_{counter}{ext}"
+                if "detected_type" in extra:
+                    stats["sniffed"] += 1
+                if "learned_confidence" in extra:
+                    stats["learned"] += 1
+                if first is not None:
+                    extra["duplicate_of"] = first["dest"] or str(first["file"])
+                if dry_run:
+                    if plan is not None:
+                        dest_file = target_path(f, cat, renamed, dest, plan.taken)
+                        link_to = first["dest"] if first is not None and duplicates == "hardlink" else None
+                        plan.add(f, dest_file, cat, renamed, extra, item["stat"], link_to)
+                        # The index keeps the source path: nothing exists at
+                        # the planned destination until the plan is applied.
+                        item["dest"] = str(dest_file)
+                        name = dest_file.name
                     else:
-                        base_name = f"{f.stem}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{counter}{ext}"
-                    dest_file = target_dir / base_name
-                    counter += 1
-                shutil.move(str(f), str(dest_file))
-                hist[str(dest_file)] = {
-                    "original": str(f),
-                    "category": cat,
-                    "timestamp": datetime.now().isoformat(),
-                    "ai_renamed": renamed is not None
-                }
+                        name = f"{clean_filename(renamed)}{f.suffix}" if renamed else f.name
+                    console.print(f"  [cyan]{f.relative_to(source)}[/cyan] → [green]{cat}[/green]/{name}"
+                                  + (" [dim](AI name)[/dim]" if renamed else ""))
+                    stats["sorted"] += 1
+                    stats["by_category"][cat] = stats["by_category"].get(cat, 0) + 1
+                    prog.advance(task)
+                    return
+                dest_file = commit_move(f, cat, renamed, dest, session, extra)
+                if first is not None and duplicates == "hardlink" and first["dest"]:
+                    try:
+                        link_tmp = str(dest_file) + ".lnk"
+                        os.link(first["dest"], link_tmp)
+                        os.replace(link_tmp, dest_file)
+                    except OSError:
+                        pass
+                item["dest"] = str(dest_file)
+                if dupes is not None and item["stat"]:
+                    dupes.moved(item["stat"].st_size, str(f), item["dest"])
                 stats["sorted"] += 1
                 stats["by_category"][cat] = stats["by_category"].get(cat, 0) + 1
+                instrument.count_file("sorted", cat, item["stat"].st_size if item["stat"] else 0)
             except Exception as e:
                 print(e)
                 stats["errors"] += 1
+                instrument.count_file("errored", item["result"][0] if item["result"] else None)
             prog.advance(task)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def flush():
+                if not batch:
+                    return
+                bfut = pool.submit(classify_batch, [str(item["file"]) for item in batch])
+                for item in batch:
+                    item["future"] = pool.submit(analyze_file, str(item["file"]), rules_dict, True, bfut,
+                                                 item["stat"], model)
+                batch.clear()
+
+            def drain():
+                item = pending[0]
+                if item["future"] is None and item["dup_of"] is None:
+                    flush()
+                item = pending.popleft()
+                finish(item)
+                waiting.pop(str(item["file"]), None)
+                # Only the result is still needed, by duplicates of this file.
+                item["future"] = item["stat"] = None
+
+            interrupted = False
+            try:
+                found = 0
+                for entry in files:
+                    # The total grows as the scanner discovers files.
+                    found += 1
+                    prog.update(task, total=found)
+                    f = Path(entry.path)
+                    if is_junk(entry.path):
+                        stats["skipped"] += 1
+                        instrument.count_file("skipped", "junk")
+                        prog.advance(task)
+                        continue
+                    size = 0
+                    st = None
+                    try:
+                        st = entry.stat()
+                        size = st.st_size
+                        stats["total_size"] += size
+                    except:
+                        pass
+                    item = {"file": f, "stat": st, "future": None, "dup_of": None, "result": None, "dest": None}
+                    if dupes is not None:
+                        first_path = dupes.find(str(f), size)
+                        if first_path is not None:
+                            item["dup_of"] = waiting.get(first_path) or sorted_copy(first_path)
+                    ambiguous = False
+                    if item["dup_of"] is None and batch_size > 1 and use_ai:
+                        cat, scores = deterministic_category(str(f), rules_dict, st)
+                        ambiguous = (scores[cat] < 10 and sniff_file(str(f)) is None
+                                     and learn.classify(model, str(f)) is None)
+                    if ambiguous:
+                        batch.append(item)
+                        if len(batch) >= batch_size:
+                            flush()
+                    elif item["dup_of"] is None:
+                        item["future"] = pool.submit(analyze_file, str(f), rules_dict, use_ai, st=st, model=model)
+                    pending.append(item)
+                    waiting[str(f)] = item
+                    if len(pending) >= window:
+                        drain()
+                while pending:
+                    drain()
+            except KeyboardInterrupt:
+                # In-flight AI calls finish and land in the cache; queued ones
+                # are dropped. Completed moves are already in history.
+                interrupted = True
+                for item in pending:
+                    if item["future"] is not None:
+                        item["future"].cancel()
     
-    save_history(hist)
+    if dry_run:
+        summary_text = (f"[bold]Files to sort:[/bold] [cyan]{stats['sorted']}[/cyan]"
+                        f"\n[bold]Total size:[/bold] [cyan]{human_size(stats['total_size'])}[/cyan]"
+                        f"\n[bold]Destination:[/bold] [cyan]{dest}[/cyan]")
+        if stats["skipped"]:
+            summary_text += f"\n[bold]Skipped:[/bold] {stats['skipped']} junk or reported duplicate files"
+        if preview_ai:
+            summary_text += (f"\n[bold]AI renames:[/bold] {stats['ai_renamed']}"
+                             "\n[dim]AI answers are cached; the real run will reuse them.[/dim]")
+        if interrupted:
+            summary_text += "\n[yellow]Preview interrupted before the end of the tree.[/yellow]"
+        console.print(Panel(summary_text, title="[yellow][bold]DRY RUN[/bold][/yellow]",
+                            border_style="yellow", box=box.ROUNDED))
+        for cat, count in sorted(stats["by_category"].items(), key=lambda x: x[1], reverse=True):
+            console.print(f"  [cyan]{cat}[/cyan]: {count}")
+        if plan is None:
+            console.print(f"\n[yellow]💡 Run without --dry-run to actually move files[/yellow]\n")
+        return
+    if interrupted:
+        historydb.set_status(session, "interrupted")
+        console.print(f"\n[yellow]Interrupted after {stats['sorted']} files.[/yellow] "
+                      f"Continue with: [cyan]shawtie {source} --resume[/cyan]")
+        return
+    historydb.set_status(session, "done")
     if recursive:
         cleanup_empty_dirs(source, dest)
     console.print()
     summary_text = f"[green] Successfully sorted:[/green] [bold]{stats['sorted']}[/bold] files"
+    summary_text += f"\n[dim]Session:[/dim] {session}"
     
     if stats["errors"] > 0:
         summary_text += f"\n[red]Errors:[/red] [bold]{stats['errors']}[/bold] files"
+    if stats["sniffed"] > 0:
+        summary_text += f"\n[cyan]Identified by content:[/cyan] [bold]{stats['sniffed']}[/bold] files (AI skipped)"
+    if stats["learned"] > 0:
+        summary_text += f"\n[cyan]Local model:[/cyan] [bold]{stats['learned']}[/bold] files classified (LLM skipped)"
+    if stats["duplicates"] > 0:
+        summary_text += f"\n[yellow]Duplicates:[/yellow] [bold]{stats['duplicates']}[/bold] files (AI skipped)"
+    cstats = cache.stats()
+    if cstats["hits"] or cstats["misses"]:
+        summary_text += (f"\n[cyan]AI cache:[/cyan] {cstats['hits']} hits, {cstats['misses']} misses "
+                         f"({cstats['hit_rate'] * 100:.0f}% hit rate)")
     console.print(Panel(summary_text, title="[green][bold]COMPLETED![/bold][/green]", 
                         border_style="green", box=box.DOUBLE))
     if stats["by_category"]:
@@ -482,6 +901,17 @@ def sort_directory(source_dir, dest_dir=None, recursive=True, dry_run=False):
 
         console.print(tab)
         console.print()
+    if reported:
+        tab = Table(title="Duplicates Left in Place", box=box.ROUNDED, show_header=True,
+                    header_style="bold yellow")
+        tab.add_column("Duplicate", style="yellow", no_wrap=False)
+        tab.add_column("Copy Of", style="cyan", no_wrap=False)
+        for dup, original in reported[:50]:
+            tab.add_row(dup, original)
+        console.print(tab)
+        if len(reported) > 50:
+            console.print(f"[dim]... and {len(reported) - 50} more[/dim]")
+        console.print()
 
 def cleanup_empty_dirs(source, dest):
     for root, dirs, files in os.walk(source, topdown=False):
@@ -564,164 +994,230 @@ def main():
 
 
 def show_hist():
-    hist = load_history()
-    if not hist:
+    days = historydb.daily_summary()
+    if not days:
         console.print("[yellow]No history found.[/yellow]")
         return
-    sessions = {}
-    for dest, info in hist.items():
-        timestamp = info.get("timestamp", "unknown")
-        date = timestamp.split("T")[0] if "T" in timestamp else timestamp
-        if date not in sessions:
-            sessions[date] = []
-        sessions[date].append((dest, info))
     tab = Table(title="Sorting History", box=box.ROUNDED, show_header=True, header_style="bold magenta")
     tab.add_column("Date", style="magenta", no_wrap=True)
     tab.add_column("Files Sorted", style="green", justify="right")
     tab.add_column("Renamed", style="cyan", justify="right")
     totalfiles = 0
     totalrenamed = 0
-    for date in sorted(sessions.keys(), reverse=True):
-        files = sessions[date]
-        renamed = sum(1 for _, info in files if info.get("ai_renamed", False))
-        tab.add_row(date, str(len(files)), str(renamed))
-        totalfiles += len(files)
+    for date, files, renamed in days:
+        tab.add_row(date, str(files), str(renamed))
+        totalfiles += files
         totalrenamed += renamed
     console.print(tab)
     console.print(f"[bold]Total files sorted:[/bold] {totalfiles}")
     console.print(f"[bold]Total files renamed:[/bold] {totalrenamed}")
 
-def undo():
-    hist = load_history()
-    if not hist:
-        console.print("[yellow] No history found.[/yellow]")
-        return
-    recents = sorted(hist.items(), key=lambda x: x[1].get("timestamp", ""), reverse=True)
-    if not recents:
-        console.print("[yellow] No history found.[/yellow]")
-        return
-    timestamp = sorted(hist.values(), key=lambda x: x.get("timestamp", ""), reverse=True)[0].get("timestamp", "")
-    date = timestamp.split("T")[0] if "T" in timestamp else timestamp
-    to_undo = {k:v for k,v in hist.items() if v.get("timestamp","").startswith(date)}
+def undo(session=None):
+    if session:
+        resolved = historydb.resolve_session(session)
+        if not resolved:
+            console.print(f"[red] Unknown session:[/red] {session}")
+            return
+        session = resolved
+    else:
+        session = historydb.last_session()
+    if session:
+        to_undo = historydb.by_session(session)
+        label = f"[cyan] Undoing session:[/cyan] [bold]{session}[/bold]"
+    else:
+        # Entries imported from the old JSON history carry no session id.
+        timestamp = historydb.latest_timestamp()
+        if not timestamp:
+            console.print("[yellow] No history found.[/yellow]")
+            return
+        date = timestamp.split("T")[0] if "T" in timestamp else timestamp
+        to_undo = historydb.on_date(date)
+        label = f"[cyan] Undoing sorting for date:[/cyan] [bold]{date}[/bold]"
     if not to_undo:
         console.print("[yellow] No files to undo.[/yellow]")
         return
-    console.print(f"[cyan] Undoing sorting for date:[/cyan] [bold]{date}[/bold]")
-    for dest, info in to_undo.items():
+    console.print(label)
+    restored = missing = 0
+    for info in reversed(to_undo):
+        dest = info["dest"]
         original = info.get("original", None)
         if original and os.path.exists(dest):
             ensure_dir(Path(original).parent)
             shutil.move(dest, original)
             console.print(f"  [green]↩️  Moved back:[/green] {Path(dest).name} → {original}")
-            del hist[dest]
-    save_history(hist)
-    console.print("[bold]Undo successful.[/bold]")
+            restored += 1
+        else:
+            # Deleted or moved away since; forget it so undo doesn't stick here.
+            console.print(f"  [yellow]Missing, skipped:[/yellow] {dest}")
+            missing += 1
+        historydb.remove(dest)
+    if session:
+        historydb.set_status(session, "undone")
+    console.print(f"[bold]Undo finished:[/bold] {restored} of {len(to_undo)} files restored"
+                  + (f", {missing} missing" if missing else ""))
+
+def show_sessions(limit=50):
+    rows = historydb.sessions(limit)
+    if not rows:
+        console.print("[yellow]No sessions found.[/yellow]")
+        return
+    tab = Table(title="Sort Sessions", box=box.ROUNDED, show_header=True, header_style="bold magenta")
+    tab.add_column("Session", style="magenta", no_wrap=True)
+    tab.add_column("Started", style="white", no_wrap=True)
+    tab.add_column("Source", style="cyan")
+    tab.add_column("Status", style="yellow")
+    tab.add_column("Files", style="green", justify="right")
+    tab.add_column("Renamed", style="cyan", justify="right")
+    for session, started, source, status, files, renamed in rows:
+        tab.add_row(session, started.split(".")[0].replace("T", " "), source or "", status, str(files), str(renamed))
+    console.print(tab)
+    console.print("[dim]Undo a specific run with: shawtie --undo SESSION[/dim]")
+
+
+def image_metadata(path):
+    meta = {}
+    with Image.open(path) as img:
+        meta["image"] = {
+            "width": img.width,
+            "height": img.height,
+            "format": img.format,
+            "mode": img.mode,
+        }
+        data = img._getexif() if hasattr(img, "_getexif") else None
+    if data:
+        exif = {}
+        for tag_id, value in data.items():
+            tag = TAGS.get(tag_id, tag_id)
+            if isinstance(value, bytes):
+                continue
+            exif[tag] = str(value)[:100]
+        meta["exif"] = {
+            "camera": exif.get("Model", "Unknown"),
+            "date_taken": exif.get("DateTime", "Unknown"),
+            "iso": exif.get("ISOSpeedRatings", "Unknown"),
+            "exposure": exif.get("ExposureTime", "Unknown"),
+            "aperture": exif.get("FNumber", "Unknown"),
+            "focal_length": exif.get("FocalLength", "Unknown"),
+            "gps": f"{exif.get('GPSLatitude', 'N/A')}, {exif.get('GPSLongitude', 'N/A')}"
+        }
+    return meta
 
+def audio_metadata(path):
+    # Header-only: a file mutagen can't parse is reported, not decoded.
+    audio = probe_audio(path, decode=False)
+    duration = audio["duration"]
+    meta = {"audio": {
+        "duration": f"{int(duration // 60)}m {int(duration % 60)}s",
+        "duration_seconds": duration,
+        "sample_rate": f"{audio['sample_rate']}Hz",
+        "channels": "Stereo" if audio["channels"] == 2 else "Mono",
+        "bits_per_sample": audio["bits_per_sample"] or "N/A",
+    }}
+    if audio["bitrate"]:
+        meta["audio"]["bitrate"] = f"{audio['bitrate'] // 1000}kbps"
+    if str(path).lower().endswith(".mp3"):
+        try:
+            from mutagen.mp3 import MP3
+            audio_file = MP3(path)
+            if audio_file.tags:
+                id3 = audio_file.tags
+                meta["id3"] = {
+                    "title": str(id3.get("TIT2", "Unknown")),
+                    "artist": str(id3.get("TPE1", "Unknown")),
+                    "album": str(id3.get("TALB", "Unknown")),
+                    "year": str(id3.get("TDRC", "Unknown")),
+                    "genre": str(id3.get("TCON", "Unknown")),
+                }
+        except Exception:
+            pass
+    return meta
 
-def get_metadata(path):
+def video_metadata(path):
+    import subprocess
+    result = subprocess.run(
+        ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', str(path)],
+        capture_output=True,
+        text=True,
+        timeout=5
+    )
+    meta = {}
+    if result.returncode == 0:
+        video_info = json.loads(result.stdout)
+        if 'format' in video_info:
+            fmt = video_info['format']
+            meta["video"] = {
+                "duration": f"{float(fmt.get('duration', 0)):.2f}s",
+                "duration_seconds": float(fmt.get('duration', 0)),
+                "bitrate": f"{int(fmt.get('bit_rate', 0)) // 1000}kbps",
+                "format": fmt.get('format_name', 'Unknown'),
+            }
+        for stream in video_info.get('streams', []):
+            if stream.get('codec_type') == 'video':
+                meta.setdefault("video", {})
+                meta["video"]["resolution"] = f"{stream.get('width', 0)}x{stream.get('height', 0)}"
+                meta["video"]["codec"] = stream.get('codec_name', 'Unknown')
+                meta["video"]["fps"] = stream.get('avg_frame_rate', 'Unknown')
+                break
+    return meta
+
+# extension -> (extractor, key for its error message)
+metadata_extractors = {}
+for _ext in [".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".gif", ".webp"]:
+    metadata_extractors[_ext] = (image_metadata, "image_error")
+for _ext in ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a']:
+    metadata_extractors[_ext] = (audio_metadata, "audio_error")
+for _ext in ['.mp4', '.mkv', '.mov', '.avi', '.webm', '.flv']:
+    metadata_extractors[_ext] = (video_metadata, "video_error")
+
+@instrument.timed("metadata")
+def get_metadata(path, st=None):
     path = Path(path)
-    if not path.exists():
-        return None
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
     meta = {
         "filename": path.name,
         "path": str(path.absolute()),
-        "size": path.stat().st_size,
-        "size_human": human_size(path.stat().st_size),
-        "created": datetime.fromtimestamp(path.stat().st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
-        "modified": datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-        "accessed": datetime.fromtimestamp(path.stat().st_atime).strftime("%Y-%m-%d %H:%M:%S"),
+        "size": st.st_size,
+        "size_human": human_size(st.st_size),
+        "created": datetime.fromtimestamp(st.st_ctime).strftime("%Y-%m-%d %H:%M:%S"),
+        "modified": datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+        "accessed": datetime.fromtimestamp(st.st_atime).strftime("%Y-%m-%d %H:%M:%S"),
         "extension": path.suffix,
         "mime_type": mimetypes.guess_type(str(path))[0] or "unknown",
     }
-    if path.suffix.lower() in [".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".gif", ".webp"]:
-        try:
-            img = Image.open(path)
-            meta["image"] = {
-                "width": img.width,
-                "height": img.height,
-                "format": img.format,
-                "mode": img.mode,
-            }
-            data = img._getexif()
-            if data:
-                exif = {}
-                for tag_id, value in data.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    if isinstance(value, bytes):
-                        continue
-                    exif[tag] = str(value)[:100]
-                meta["exif"] = {
-                    "camera": exif.get("Model", "Unknown"),
-                    "date_taken": exif.get("DateTime", "Unknown"),
-                    "iso": exif.get("ISOSpeedRatings", "Unknown"),
-                    "exposure": exif.get("ExposureTime", "Unknown"),
-                    "aperture": exif.get("FNumber", "Unknown"),
-                    "focal_length": exif.get("FocalLength", "Unknown"),
-                    "gps": f"{exif.get('GPSLatitude', 'N/A')}, {exif.get('GPSLongitude', 'N/A')}"
-                }
-        except Exception as e:
-            meta["image_error"] = str(e)
-            
-    if path.suffix.lower() in ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a']:
-        try:
-            audio = AudioSegment.from_file(path)
-            duration = len(audio) / 1000.0
-            meta["audio"] = {
-                "duration": f"{int(duration // 60)}m {int(duration % 60)}s",
-                "sample_rate": f"{audio.frame_rate}Hz",
-                "channels": "Stereo" if audio.channels == 2 else "Mono",
-                "bits_per_sample": audio.sample_width * 8,
-            }
-            if path.suffix.lower() == '.mp3':
-                try:
-                    from mutagen.mp3 import MP3
-                    from mutagen.id3 import ID3
-                    audio_file = MP3(path)
-                    meta["audio"]["bitrate"] = f"{audio_file.info.bitrate // 1000}kbps"
-                    if audio_file.tags:
-                        id3 = audio_file.tags
-                        meta["id3"] = {
-                            "title": str(id3.get("TIT2", "Unknown")),
-                            "artist": str(id3.get("TPE1", "Unknown")),
-                            "album": str(id3.get("TALB", "Unknown")),
-                            "year": str(id3.get("TDRC", "Unknown")),
-                            "genre": str(id3.get("TCON", "Unknown")),
-                        }
-                except ImportError:
-                    pass
-                except Exception:
-                    pass
-        except Exception as e:
-            meta["audio_error"] = str(e)
-            
-    if path.suffix.lower() in ['.mp4', '.mkv', '.mov', '.avi', '.webm', '.flv']:
-        try:
-            import subprocess
-            result = subprocess.run(
-                ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', str(path)],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                video_info = json.loads(result.stdout)
-                if 'format' in video_info:
-                    fmt = video_info['format']
-                    meta["video"] = {
-                        "duration": f"{float(fmt.get('duration', 0)):.2f}s",
-                        "bitrate": f"{int(fmt.get('bit_rate', 0)) // 1000}kbps",
-                        "format": fmt.get('format_name', 'Unknown'),
-                    }
-                for stream in video_info.get('streams', []):
-                    if stream.get('codec_type') == 'video':
-                        meta["video"]["resolution"] = f"{stream.get('width', 0)}x{stream.get('height', 0)}"
-                        meta["video"]["codec"] = stream.get('codec_name', 'Unknown')
-                        meta["video"]["fps"] = stream.get('avg_frame_rate', 'Unknown')
-                        break
-        except Exception as e:
-            meta["video_error"] = str(e)
+    meta.update(extracted_metadata(path, st))
     return meta
 
+def extracted_metadata(path, st=None):
+    # Type-specific metadata for path, served from the index while the file
+    # is unchanged. Also used by duration/camera rules when sorting.
+    extractor = metadata_extractors.get(os.path.splitext(str(path))[1].lower())
+    if not extractor:
+        return {}
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return {}
+    data = metaindex.get(st, path)
+    if data is not None:
+        return data
+    fn, error_key = extractor
+    try:
+        data = fn(path)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        # Environmental (missing ffprobe, permissions, a slow disk): retry next time.
+        return {error_key: str(e)}
+    except Exception as e:
+        data = {error_key: str(e)}
+    metaindex.put(st, path, data)
+    return data
+
+ruleset.metadata_source = extracted_metadata
+
 
 def display_metadata(meta):
     if not meta:
@@ -797,7 +1293,34 @@ def display_metadata(meta):
         console.print()
 
 
-def show_metadata(path):
+def metadata_kind(meta):
+    for kind in ("image", "audio", "video"):
+        if kind in meta:
+            return kind
+    mime = meta["mime_type"]
+    return mime.split("/")[0] if mime != "unknown" else "other"
+
+def metadata_line(meta, root):
+    try:
+        name = str(Path(meta["path"]).relative_to(root))
+    except ValueError:
+        name = meta["filename"]
+    if "image" in meta:
+        details = f"{meta['image']['width']}x{meta['image']['height']} {meta['image']['format']}"
+        if "exif" in meta and meta["exif"]["camera"] != "Unknown":
+            details += f" • {meta['exif']['camera']}"
+    elif "audio" in meta:
+        details = f"{meta['audio']['duration']} • {meta['audio']['sample_rate']} • {meta['audio']['channels']}"
+    elif "video" in meta:
+        details = f"{meta['video'].get('duration', '?')} • {meta['video'].get('resolution', '?')} • {meta['video'].get('codec', '?')}"
+    else:
+        details = meta["mime_type"]
+    errors = [v for k, v in meta.items() if k.endswith("_error")]
+    if errors:
+        details += f" [red]({errors[0][:60]})[/red]"
+    return f"[cyan]{name}[/cyan]  [green]{meta['size_human']}[/green]  {details}"
+
+def show_metadata(path, workers=None, panels=False):
     p = Path(path)
     if not p.exists():
         console.print(f"[red]Path not found: {path}[/red]")
@@ -806,16 +1329,62 @@ def show_metadata(path):
         console.print(f"\n[bold green]Reading metadata for:[/bold green] {p.name}\n")
         metadata = get_metadata(p)
         display_metadata(metadata)
-    else:
-        files = list(p.rglob('*')) if p.is_dir() else []
-        files = [f for f in files if f.is_file()]
-        if not files:
-            console.print("[yellow] No files found in directory[/yellow]")
+        return
+    # Extraction is mostly file I/O and ffprobe, so threads overlap well.
+    # Results print as they complete; only a bounded window is in flight.
+    workers = max(1, workers or min(32, (os.cpu_count() or 1) * 4))
+    totals = {}
+    count = 0
+    failed = 0
+    running = set()
+
+    def report(fut):
+        nonlocal count, failed
+        meta = fut.result()
+        if meta is None:
             return
-        console.print(f"\n[bold green]Found {len(files)} files[/bold green]\n")
-        for i, file in enumerate(files, 1):
-            console.print(f"\n[bold cyan]═══ File {i}/{len(files)} ═══[/bold cyan]\n")
-            metadata = get_metadata(file)
-            display_metadata(metadata) 
-            if i < len(files):
-                console.print("\n" + "─" * 80 + "\n")
\ No newline at end of file
+        count += 1
+        kind = metadata_kind(meta)
+        row = totals.setdefault(kind, [0, 0, 0.0])
+        row[0] += 1
+        row[1] += meta["size"]
+        row[2] += meta.get(kind, {}).get("duration_seconds", 0.0) if kind in ("audio", "video") else 0.0
+        if any(k.endswith("_error") for k in meta):
+            failed += 1
+        if panels:
+            if count > 1:
+                console.print("\n" + "─" * 80 + "\n")
+            console.print(f"\n[bold cyan]═══ File {count} ═══[/bold cyan]\n")
+            display_metadata(meta)
+        else:
+            console.print(metadata_line(meta, p))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entry in instrument.timed_iter("scan", scan_files(p)):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            running.add(pool.submit(get_metadata, entry.path, st))
+            if len(running) >= workers * 4:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    report(fut)
+        for fut in as_completed(running):
+            report(fut)
+    if not count:
+        console.print("[yellow] No files found in directory[/yellow]")
+        return
+    tab = Table(title="\nMetadata Summary", box=box.ROUNDED, show_header=True, header_style="bold cyan")
+    tab.add_column("Type", style="cyan")
+    tab.add_column("Files", justify="right", style="green")
+    tab.add_column("Size", justify="right", style="yellow")
+    tab.add_column("Duration", justify="right")
+    for kind, (files, size, seconds) in sorted(totals.items(), key=lambda kv: -kv[1][0]):
+        duration = f"{int(seconds // 3600)}h {int(seconds % 3600 // 60)}m {int(seconds % 60)}s" if seconds else "-"
+        tab.add_row(kind, str(files), human_size(size), duration)
+    console.print(tab)
+    summary = f"\n[bold green]Found {count} files[/bold green]"
+    if failed:
+        summary += f" [red]({failed} with unreadable metadata)[/red]"
+    console.print(summary + "\n")
@@ -0,0 +1,135 @@
+"""Persistent index of extracted file metadata (EXIF, audio, video)"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+path = Path.home() / ".smartsort_metadata.db"
+enabled = True
+max_entries = 500_000
+# Bump whenever an extractor's output changes so old rows are recomputed.
+version = 1
+
+_conn = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def configure(enabled=None, path=None, max_entries=None):
+    with _lock:
+        _set(enabled, path, max_entries)
+
+
+def _set(new_enabled, new_path, new_max_entries):
+    global enabled, path, max_entries, _conn
+    if new_enabled is not None:
+        enabled = new_enabled
+    if new_path is not None:
+        path = Path(new_path)
+    if new_max_entries is not None:
+        max_entries = new_max_entries
+    if _conn is not None:
+        _conn.close()
+        _conn = None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(str(path), check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        # A file keeps its (device, inode) across renames and moves within a
+        # filesystem, so sorted files still hit; size and mtime_ns detect
+        # edits, version detects extractor changes.
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "version INTEGER NOT NULL, path TEXT NOT NULL, data TEXT NOT NULL, stored REAL NOT NULL, "
+            "PRIMARY KEY (dev, ino))"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS files_stored ON files(stored)")
+    return _conn
+
+
+def get(st, file_path):
+    """Stored metadata for the file behind stat result st, or None if missing or stale"""
+    if not enabled:
+        return None
+    with _lock:
+        db = _db()
+        row = db.execute(
+            "SELECT size, mtime_ns, version, path, data FROM files WHERE dev = ? AND ino = ?", (st.st_dev, st.st_ino)
+        ).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns or row[2] != version:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        if row[3] != str(file_path):
+            # Same inode under a new name: the file was moved or renamed.
+            db.execute("UPDATE files SET path = ? WHERE dev = ? AND ino = ?", (str(file_path), st.st_dev, st.st_ino))
+            db.commit()
+    return json.loads(row[4])
+
+
+def put(st, file_path, data):
+    if not enabled:
+        return
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO files (dev, ino, size, mtime_ns, version, path, data, stored) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, version, str(file_path), json.dumps(data), time.time()),
+        )
+        db.commit()
+
+
+def compact():
+    """Drop rows for deleted, replaced or changed files and old versions; returns rows dropped"""
+    with _lock:
+        db = _db()
+        stale = []
+        for dev, ino, size, mtime_ns, ver, file_path in db.execute(
+                "SELECT dev, ino, size, mtime_ns, version, path FROM files"):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                stale.append((dev, ino))
+                continue
+            if ((st.st_dev, st.st_ino) != (dev, ino) or st.st_size != size
+                    or st.st_mtime_ns != mtime_ns or ver != version):
+                stale.append((dev, ino))
+        db.executemany("DELETE FROM files WHERE dev = ? AND ino = ?", stale)
+        dropped = len(stale)
+        count = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        if count > max_entries:
+            db.execute(
+                "DELETE FROM files WHERE rowid IN (SELECT rowid FROM files ORDER BY stored ASC LIMIT ?)",
+                (count - max_entries,),
+            )
+            dropped += count - max_entries
+        db.commit()
+        db.execute("VACUUM")
+    return dropped
+
+
+def clear():
+    with _lock:
+        db = _db()
+        dropped = db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        db.execute("DELETE FROM files")
+        db.commit()
+        db.execute("VACUUM")
+    return dropped
+
+
+def stats():
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        entries = _db().execute("SELECT COUNT(*) FROM files").fetchone()[0] if enabled else 0
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0, "entries": entries}
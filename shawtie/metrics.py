@@ -0,0 +1,177 @@
+"""Prometheus/OpenMetrics export of the counters collected by instrument.
+
+Either write a textfile for node_exporter's textfile collector (rewritten
+atomically every ``interval`` seconds and once more on exit), or serve
+``/metrics`` over HTTP for the lifetime of the process.
+"""
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import cache, instrument
+
+prefix = "shawtie"
+
+_started = time.time()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(v):
+    if isinstance(v, float):
+        return repr(v) if v == v and v not in (float("inf"), float("-inf")) else ("+Inf" if v > 0 else "NaN")
+    return str(v)
+
+
+class _Writer:
+    def __init__(self, openmetrics):
+        self.openmetrics = openmetrics
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        # Prometheus text format names counters with their _total suffix;
+        # OpenMetrics names the family without it.
+        family = f"{prefix}_{name}"
+        if kind == "counter" and not self.openmetrics:
+            family += "_total"
+        self.lines.append(f"# HELP {family} {help_text}")
+        self.lines.append(f"# TYPE {family} {kind}")
+
+    def sample(self, name, value, labels=None):
+        self.lines.append(f"{prefix}_{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name, hist, labels):
+        cumulative = 0
+        for bound, n in zip(list(instrument.buckets) + ["+Inf"], hist["buckets"].values()):
+            cumulative += n
+            self.sample(f"{name}_bucket", cumulative, dict(labels, le=str(bound)))
+        self.sample(f"{name}_sum", hist["total"], labels)
+        self.sample(f"{name}_count", hist["count"], labels)
+
+
+def render(openmetrics=False):
+    """The current metrics in Prometheus text format, or OpenMetrics"""
+    data = instrument.snapshot()
+    counters = data["counters"]
+    w = _Writer(openmetrics)
+
+    w.family("files", "counter", "Files processed, by outcome (sorted, skipped, errored) and category.")
+    for row in data["files"]:
+        w.sample("files_total", row["count"], {"outcome": row["outcome"], "category": row["category"]})
+
+    w.family("bytes_moved", "counter", "Bytes of files moved into the destination.")
+    w.sample("bytes_moved_total", counters.get("bytes_moved", 0))
+    w.family("bytes_read", "counter", "Bytes read from files for sniffing, hashing and AI prompts.")
+    w.sample("bytes_read_total", counters.get("bytes_read", 0))
+
+    w.family("ai_requests", "counter", "AI HTTP requests sent, including retries.")
+    for model, hist in sorted(data["models"].items()):
+        w.sample("ai_requests_total", hist.get("requests", 0), {"model": model})
+    w.family("ai_retries", "counter", "AI requests that were retries of a failed attempt.")
+    for model, hist in sorted(data["models"].items()):
+        w.sample("ai_retries_total", hist.get("retries", 0), {"model": model})
+    w.family("ai_throttled", "counter", "AI requests rejected with 429 or timed out.")
+    for model, hist in sorted(data["models"].items()):
+        w.sample("ai_throttled_total", hist.get("throttled", 0), {"model": model})
+    w.family("ai_upload_bytes", "counter", "Request body bytes sent to the AI endpoint.")
+    for model, hist in sorted(data["models"].items()):
+        w.sample("ai_upload_bytes_total", hist.get("bytes_uploaded", 0), {"model": model})
+
+    w.family("ai_request_duration_seconds", "histogram", "AI request latency per attempt.")
+    for model, hist in sorted(data["models"].items()):
+        w.histogram("ai_request_duration_seconds", hist, {"model": model})
+
+    w.family("stage_duration_seconds", "histogram", "Time spent per pipeline stage call.")
+    for stage, hist in sorted(data["stages"].items()):
+        w.histogram("stage_duration_seconds", hist, {"stage": stage})
+
+    c = cache.stats()
+    w.family("cache_hits", "counter", "AI result cache hits.")
+    w.sample("cache_hits_total", c["hits"])
+    w.family("cache_misses", "counter", "AI result cache misses.")
+    w.sample("cache_misses_total", c["misses"])
+    w.family("cache_hit_ratio", "gauge", "Share of AI lookups answered from the cache.")
+    w.sample("cache_hit_ratio", float(c["hit_rate"]))
+    w.family("cache_entries", "gauge", "Entries in the AI result cache.")
+    w.sample("cache_entries", c["entries"])
+
+    w.family("start_time_seconds", "gauge", "Unix time the process started.")
+    w.sample("start_time_seconds", float(_started))
+    w.family("last_update_seconds", "gauge", "Unix time these metrics were rendered.")
+    w.sample("last_update_seconds", float(time.time()))
+    if openmetrics:
+        w.lines.append("# EOF")
+    return "\n".join(w.lines) + "\n"
+
+
+def write_textfile(path):
+    """Atomically replace path so the collector never sees a partial file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+class TextfileExporter:
+    """Rewrites the textfile every interval seconds until stopped"""
+
+    def __init__(self, path, interval=15.0):
+        self.path = path
+        self.interval = interval
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            try:
+                write_textfile(self.path)
+            except OSError:
+                pass
+
+    def start(self):
+        write_textfile(self.path)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        write_textfile(self.path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = render(openmetrics).encode()
+        self.send_response(200)
+        if openmetrics:
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        else:
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
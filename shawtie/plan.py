@@ -0,0 +1,177 @@
+"""Serializable sort plans: analyse now, move later.
+
+``make_plan`` runs the full sort pipeline as a dry run and writes every
+decision, with final collision-free destinations, to a JSON file.
+``apply_plan`` replays that file as plain filesystem moves with no AI
+calls, recording history so the run can be undone like any other.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from rich.progress import BarColumn, Progress, SpinnerColumn, TextColumn, TimeElapsedColumn
+
+from . import cache, historydb, instrument
+from .main import cleanup_empty_dirs, commit_move, console, ensure_dir, sort_directory
+
+version = 1
+
+
+class PlanWriter:
+    """Streams plan entries to disk as they are decided"""
+
+    def __init__(self, path, source, dest, recursive):
+        self.path = path
+        self.f = open(path, "w")
+        self.taken = set()
+        # source -> planned destination, for duplicates of earlier entries
+        self.planned = {}
+        self.moves = 0
+        self.skipped = 0
+        header = {
+            "version": version,
+            "created": datetime.now().isoformat(),
+            "source": str(source),
+            "dest": str(dest),
+            "recursive": recursive,
+        }
+        self.f.write(json.dumps(header)[:-1] + ', "entries": [\n')
+        self.first = True
+
+    def _write(self, entry):
+        self.f.write(("" if self.first else ",\n") + json.dumps(entry))
+        self.first = False
+
+    def add(self, src, dest_file, category, renamed, extra, st, link_to=None):
+        entry = {"action": "move", "src": str(src), "dest": str(dest_file), "category": category,
+                 "ai_renamed": renamed is not None}
+        if st is not None:
+            entry["size"] = st.st_size
+            entry["mtime_ns"] = st.st_mtime_ns
+        if extra:
+            entry["extra"] = extra
+        if link_to:
+            entry["link_to"] = link_to
+        self._write(entry)
+        self.planned[str(src)] = str(dest_file)
+        self.moves += 1
+
+    def skip(self, src, reason, duplicate_of=None):
+        entry = {"action": "skip", "src": str(src), "reason": reason}
+        if duplicate_of:
+            entry["duplicate_of"] = duplicate_of
+        self._write(entry)
+        self.skipped += 1
+
+    def close(self):
+        self.f.write('\n], "summary": ' + json.dumps({"moves": self.moves, "skipped": self.skipped}) + "}\n")
+        self.f.close()
+
+
+def make_plan(source_dir, plan_path, dest_dir=None, recursive=True, workers=1, batch_size=1,
+              duplicates="sort", use_model=False, use_ai=True):
+    source = Path(source_dir).resolve()
+    dest = Path(dest_dir).resolve() if dest_dir else source / "sorted"
+    if not source.is_dir():
+        console.print(f"[red]Not a directory: {source_dir}[/red]")
+        return None
+    writer = PlanWriter(plan_path, source, dest, recursive)
+    try:
+        sort_directory(source, dest, recursive, dry_run=True, workers=workers, batch_size=batch_size,
+                       duplicates=duplicates, use_model=use_model, preview_ai=use_ai, plan=writer)
+    finally:
+        writer.close()
+    console.print(f"[green]Plan written to[/green] {plan_path} "
+                  f"[dim]({writer.moves} moves, {writer.skipped} skipped)[/dim]")
+    console.print(f"[yellow]💡 Review it, then run:[/yellow] [cyan]shawtie apply {plan_path}[/cyan]")
+    return writer.moves
+
+
+def load(plan_path):
+    with open(plan_path, "r") as f:
+        plan = json.load(f)
+    if plan.get("version") != version:
+        raise ValueError(f"unsupported plan version {plan.get('version')}")
+    return plan
+
+
+def _free_name(dest_file):
+    # Same "_N" suffix target_path uses, so the planned name is kept.
+    counter = 1
+    candidate = dest_file
+    while candidate.exists():
+        candidate = dest_file.with_name(f"{dest_file.stem}_{counter}{dest_file.suffix}")
+        counter += 1
+    return candidate
+
+
+def _same_file_content(a, b):
+    try:
+        return os.path.getsize(a) == os.path.getsize(b) and cache.content_hash(a) == cache.content_hash(b)
+    except OSError:
+        return False
+
+
+def apply_plan(plan_path):
+    """Execute the moves in a plan; returns (moved, skipped, errors)"""
+    plan = load(plan_path)
+    source, dest = Path(plan["source"]), Path(plan["dest"])
+    moves = [e for e in plan["entries"] if e["action"] == "move"]
+    session = historydb.begin_session(source, dest)
+    moved = skipped = errors = 0
+    made_dirs = set()
+    # planned destination -> where this run actually put the file
+    placed = {}
+    with Progress(SpinnerColumn(), TextColumn("[prog.description]{task.description}"), BarColumn(),
+                  TextColumn("[cyan]{task.completed}/{task.total}[/cyan]"), TimeElapsedColumn(),
+                  console=console) as prog:
+        task = prog.add_task("[cyan]Applying plan...", total=len(moves))
+        for entry in moves:
+            src = Path(entry["src"])
+            try:
+                st = os.stat(src)
+            except OSError:
+                console.print(f"  [yellow]Missing, skipped:[/yellow] {src}")
+                skipped += 1
+                prog.advance(task)
+                continue
+            if "size" in entry and (st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]):
+                console.print(f"  [yellow]Changed since planning, skipped:[/yellow] {src}")
+                skipped += 1
+                prog.advance(task)
+                continue
+            dest_file = Path(entry["dest"])
+            if dest_file.parent not in made_dirs:
+                ensure_dir(dest_file.parent)
+                made_dirs.add(dest_file.parent)
+            if dest_file.exists():
+                # Something appeared at the planned name; pick a fresh one.
+                dest_file = _free_name(dest_file)
+            # commit_move only needs to know whether the name came from the AI.
+            renamed = dest_file.stem if entry.get("ai_renamed") else None
+            try:
+                dest_file = commit_move(src, entry["category"], renamed, dest, session,
+                                        entry.get("extra"), dest_file=dest_file)
+                placed[entry["dest"]] = str(dest_file)
+                instrument.count_file("sorted", entry["category"], st.st_size)
+                # Only link to a first copy this run moved, and only if it
+                # still has the same content as the duplicate.
+                first = placed.get(entry.get("link_to"))
+                if first and _same_file_content(first, dest_file):
+                    link_tmp = str(dest_file) + ".lnk"
+                    os.link(first, link_tmp)
+                    os.replace(link_tmp, dest_file)
+                moved += 1
+            except OSError as e:
+                console.print(f"  [red]✗[/red] {src}: {e}")
+                instrument.count_file("errored", entry["category"])
+                errors += 1
+            prog.advance(task)
+    historydb.set_status(session, "done")
+    if plan.get("recursive", True):
+        cleanup_empty_dirs(source, dest)
+    console.print(f"\n[bold green]Applied plan:[/bold green] {moved} moved, {skipped} skipped, "
+                  f"{errors} errors [dim](session {session})[/dim]")
+    return moved, skipped, errors
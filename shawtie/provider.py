@@ -0,0 +1,117 @@
+"""Configurable OpenAI-compatible chat completion providers"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from . import client
+
+config_path = Path.home() / ".smartsort_provider.json"
+
+default_config = {
+    "url": "https://ai.hackclub.com/proxy/v1/chat/completions",
+    "key": "sk-hc-v1-92624fcb92464305a0461b27bd661b0514a787f5948f4938b3f7c077d9ea7fa7",
+    "models": {
+        "llm": "qwen/qwen3-32b",
+        "vlm": "qwen/qwen3-vl-235b-a22b-instruct",
+    },
+}
+
+
+class Provider:
+    """An endpoint, a way to find its API key, and a role -> model map.
+
+    The key is looked up from ``key_env`` (an environment variable name),
+    then ``key_file``, then the literal ``key``; providers without a key
+    (e.g. a local llama.cpp server) send no Authorization header.
+    """
+
+    def __init__(self, url, key=None, key_env=None, key_file=None, models=None, headers=None):
+        self.url = url
+        self.key = key
+        self.key_env = key_env
+        self.key_file = key_file
+        self.models = dict(default_config["models"])
+        self.models.update(models or {})
+        self.headers = headers or {}
+
+    def api_key(self):
+        if self.key_env and os.environ.get(self.key_env):
+            return os.environ[self.key_env]
+        if self.key_file:
+            try:
+                return Path(self.key_file).expanduser().read_text().strip()
+            except OSError:
+                pass
+        return self.key
+
+    def model(self, role):
+        return self.models.get(role, role)
+
+    def complete(self, model, messages):
+        headers = {"Content-Type": "application/json"}
+        key = self.api_key()
+        if key:
+            headers["Authorization"] = f"Bearer {key}"
+        headers.update(self.headers)
+        r = client.post(self.url, model=model, headers=headers, json={"model": model, "messages": messages})
+        response = r.json()
+        if isinstance(response, dict):
+            return response["choices"][0]["message"]["content"].strip()
+        return str(response).strip()
+
+
+def from_config(config):
+    return Provider(
+        config.get("url", default_config["url"]),
+        key=config.get("key"),
+        key_env=config.get("key_env"),
+        key_file=config.get("key_file"),
+        models=config.get("models"),
+        headers=config.get("headers"),
+    )
+
+
+def _read_config(path):
+    """The JSON object in path; ValueError if it isn't a valid provider config"""
+    with open(path, "r") as f:
+        user = json.load(f)
+    if not isinstance(user, dict):
+        raise ValueError("expected a JSON object")
+    for name in ("models", "headers"):
+        if not isinstance(user.get(name, {}), dict):
+            raise ValueError(f'"{name}" must be an object')
+    return user
+
+
+def load(path=None):
+    """Build the provider from defaults, the JSON config file and env vars.
+
+    Recognised environment variables: SHAWTIE_API_URL, SHAWTIE_API_KEY,
+    SHAWTIE_LLM_MODEL and SHAWTIE_VLM_MODEL. An unreadable or malformed
+    config file is reported and ignored, so history and undo still work.
+    """
+    config = json.loads(json.dumps(default_config))
+    path = Path(path) if path else config_path
+    user = {}
+    if path.exists():
+        try:
+            user = _read_config(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring provider config {path}: {e}", file=sys.stderr)
+    if "url" in user and "key" not in user:
+        # A custom endpoint must not inherit the default proxy key.
+        config.pop("key")
+    models = user.pop("models", {})
+    config.update(user)
+    config["models"].update(models)
+    if os.environ.get("SHAWTIE_API_URL"):
+        config["url"] = os.environ["SHAWTIE_API_URL"]
+        config.pop("key", None)
+    if os.environ.get("SHAWTIE_API_KEY"):
+        config["key"] = os.environ["SHAWTIE_API_KEY"]
+    for role in ("llm", "vlm"):
+        if os.environ.get(f"SHAWTIE_{role.upper()}_MODEL"):
+            config["models"][role] = os.environ[f"SHAWTIE_{role.upper()}_MODEL"]
+    return from_config(config)
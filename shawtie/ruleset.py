@@ -0,0 +1,187 @@
+"""Compile ~/.smartsort_rules.json into hash maps and combined regexes"""
+
+import copy
+import fnmatch
+import os
+import re
+import time
+
+# Heuristics that apply to the plain list-of-extensions rule format.
+builtin_heuristics = {
+    "Images": {"keywords": ["screenshot", "screen", "img", "photo"], "weight": 4},
+    "Docs": {"keywords": ["invoice", "bill", "receipt"], "weight": 5},
+    "Videos": {"min_size": 50_000_001, "weight": 4},
+}
+
+EXTENSION_SCORE = 10
+DEFAULT_WEIGHT = 5
+
+# Callable (path, st) -> extracted metadata dict, set by main so duration
+# and camera rules can read the persistent metadata index.
+metadata_source = None
+
+
+def _spec(cat, value):
+    if isinstance(value, dict):
+        return value
+    spec = {"extensions": value}
+    spec.update(builtin_heuristics.get(cat, {}))
+    return spec
+
+
+def _range(spec, lo_key, hi_key):
+    if lo_key not in spec and hi_key not in spec:
+        return None
+    return spec.get(lo_key, 0), spec.get(hi_key, float("inf"))
+
+
+def _named_union(patterns, anchor):
+    # One regex for all categories; the matching group names the category.
+    parts = [f"(?P<c{i}>{p})" for i, p in patterns]
+    return re.compile(anchor + "(?:" + "|".join(parts) + ")") if parts else None
+
+
+class CompiledRules:
+    """Rules dict compiled into hash maps and combined regexes.
+
+    Match order: every predicate that fires adds to its category's score
+    (extension = 10, others = the category's ``weight``). The size, age,
+    duration and camera filters of a category form a single predicate that
+    fires only when all of them hold. The best score wins; ties go to the
+    higher ``priority`` and then to the category that comes first in the
+    rules file. Globs and path prefixes each use one combined regex, so for
+    them the first matching category in file order is the one credited.
+
+    Extension, keyword, glob and prefix matching cost about the same however
+    many categories there are. Filters are checked one category at a time,
+    so they scale with the categories that use them.
+    """
+
+    def __init__(self, rules_dict):
+        self.categories = list(rules_dict.keys())
+        self.rank = {}
+        self.weight = {}
+        self.ext_map = {}
+        keyword_map = {}
+        globs, prefixes = [], []
+        # (category, size range, age range in days, duration range, cameras);
+        # a part the category doesn't set is None.
+        self.filters = []
+        for i, (cat, value) in enumerate(rules_dict.items()):
+            spec = _spec(cat, value)
+            self.rank[cat] = (spec.get("priority", 0), -i)
+            self.weight[cat] = spec.get("weight", DEFAULT_WEIGHT)
+            for ext in spec.get("extensions", []):
+                self.ext_map.setdefault(ext.lower().lstrip("."), []).append(cat)
+            for kw in spec.get("keywords", []):
+                keyword_map.setdefault(kw.lower(), []).append(cat)
+            for g in spec.get("globs", []):
+                globs.append((i, fnmatch.translate(g.lower())))
+            for p in spec.get("path_prefixes", []):
+                # Whole path components only: "bank" must not match "bank-old".
+                prefix = os.path.abspath(os.path.expanduser(p)).rstrip(os.sep) or os.sep
+                prefixes.append((i, re.escape(prefix) + f"(?:{re.escape(os.sep)}|$)"))
+            size = _range(spec, "min_size", "max_size")
+            # Age in days: older_than_days is the lower bound, newer_than_days the upper.
+            age = _range(spec, "older_than_days", "newer_than_days")
+            duration = _range(spec, "min_duration", "max_duration")
+            cameras = [c.lower() for c in spec["cameras"]] if spec.get("cameras") else None
+            if size or age or duration or cameras:
+                self.filters.append((cat, size, age, duration, cameras))
+        self.keyword_map = keyword_map
+        words = sorted(keyword_map, key=len, reverse=True)
+        # Lookahead so overlapping keywords ("screen"/"screenshot") are all seen.
+        self.keyword_re = re.compile("(?=(" + "|".join(map(re.escape, words)) + "))") if words else None
+        self.glob_re = _named_union(globs, "")
+        self.prefix_re = _named_union(prefixes, "^")
+        self.needs_metadata = any(f[3] or f[4] for f in self.filters)
+        self.needs_stat = bool(self.filters)
+
+    def __contains__(self, cat):
+        return cat in self.rank
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def keys(self):
+        return self.categories
+
+    def _group_cat(self, m):
+        return self.categories[int(m.lastgroup[1:])]
+
+    def score(self, path, st=None):
+        """Return (best category, {category: score}) for path"""
+        name = os.path.basename(path).lower()
+        ext = name.split(".")[-1] if "." in name else ""
+        scores = {}
+
+        for cat in self.ext_map.get(ext, ()) if ext else ():
+            scores[cat] = scores.get(cat, 0) + EXTENSION_SCORE
+        if self.keyword_re is not None:
+            hit = set()
+            for m in self.keyword_re.finditer(name):
+                hit.update(self.keyword_map[m.group(1)])
+            for cat in hit:
+                scores[cat] = scores.get(cat, 0) + self.weight[cat]
+        if self.glob_re is not None:
+            m = self.glob_re.match(name)
+            if m:
+                cat = self._group_cat(m)
+                scores[cat] = scores.get(cat, 0) + self.weight[cat]
+        if self.prefix_re is not None:
+            m = self.prefix_re.match(os.path.abspath(path))
+            if m:
+                cat = self._group_cat(m)
+                scores[cat] = scores.get(cat, 0) + self.weight[cat]
+        if self.needs_stat:
+            if st is None:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None
+            if st is not None:
+                self._score_filters(path, st, scores)
+
+        if not scores:
+            first = self.categories[0] if self.categories else "Misc"
+            return first, {first: 0}
+        best = max(scores, key=lambda c: (scores[c],) + self.rank[c])
+        return best, scores
+
+    def _score_filters(self, path, st, scores):
+        age_days = (time.time() - st.st_mtime) / 86400
+        meta = None
+        for cat, size, age, duration, cameras in self.filters:
+            if size and not size[0] <= st.st_size <= size[1]:
+                continue
+            if age and not age[0] <= age_days <= age[1]:
+                continue
+            if duration or cameras:
+                if meta is None:
+                    meta = metadata_source(path, st) if metadata_source is not None else {}
+                if duration:
+                    seconds = (meta.get("audio") or meta.get("video") or {}).get("duration_seconds")
+                    if seconds is None or not duration[0] <= seconds <= duration[1]:
+                        continue
+                if cameras:
+                    camera = meta.get("exif", {}).get("camera", "").lower()
+                    if camera in ("", "unknown") or not any(n in camera for n in cameras):
+                        continue
+            scores[cat] = scores.get(cat, 0) + self.weight[cat]
+
+
+# (copy of the last rules dict compiled, its CompiledRules)
+_last = None
+
+
+def compile_rules(rules_dict):
+    """CompiledRules for rules_dict, reusing the last result if the rules are unchanged"""
+    global _last
+    if isinstance(rules_dict, CompiledRules):
+        return rules_dict
+    last = _last
+    if last is not None and last[0] == rules_dict:
+        return last[1]
+    compiled = CompiledRules(rules_dict)
+    _last = (copy.deepcopy(rules_dict), compiled)
+    return compiled
@@ -0,0 +1,80 @@
+"""Identify files from their leading bytes, without trusting the extension"""
+
+from . import instrument
+
+# (offset, signature, type, category), checked in order.
+signatures = [
+    (0, b"\x89PNG\r\n\x1a\n", "png", "Images"),
+    (0, b"\xff\xd8\xff", "jpg", "Images"),
+    (0, b"GIF87a", "gif", "Images"),
+    (0, b"GIF89a", "gif", "Images"),
+    (0, b"II*\x00", "tiff", "Images"),
+    (0, b"MM\x00*", "tiff", "Images"),
+    (0, b"%PDF-", "pdf", "Docs"),
+    (0, b"{\\rtf", "rtf", "Docs"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc", "Docs"),
+    (0, b"\x1a\x45\xdf\xa3", "mkv", "Videos"),
+    (0, b"FLV\x01", "flv", "Videos"),
+    (0, b"ID3", "mp3", "Audio"),
+    (0, b"\xff\xfb", "mp3", "Audio"),
+    (0, b"fLaC", "flac", "Audio"),
+    (0, b"OggS", "ogg", "Audio"),
+    (0, b"\x1f\x8b", "gz", "Archives"),
+    (0, b"BZh", "bz2", "Archives"),
+    (0, b"\xfd7zXZ\x00", "xz", "Archives"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z", "Archives"),
+    (0, b"Rar!\x1a\x07", "rar", "Archives"),
+    (257, b"ustar", "tar", "Archives"),
+    (0, b"\x7fELF", "elf", "Misc"),
+    (0, b"SQLite format 3\x00", "sqlite", "Misc"),
+    (0, b"#!", "script", "Code"),
+]
+
+_riff = {b"WEBP": ("webp", "Images"), b"WAVE": ("wav", "Audio"), b"AVI ": ("avi", "Videos")}
+_ftyp = {b"M4A ": ("m4a", "Audio"), b"M4B ": ("m4a", "Audio"), b"qt  ": ("mov", "Videos"),
+         b"heic": ("heic", "Images"), b"heix": ("heic", "Images"), b"mif1": ("heic", "Images"),
+         b"avif": ("avif", "Images")}
+
+header_size = 512
+
+
+def _zip_kind(head):
+    # The first local file header's name tells Office/OpenDocument files
+    # apart from plain archives.
+    name = head[30:30 + int.from_bytes(head[26:28], "little")]
+    if name.startswith(b"word/"):
+        return "docx", "Docs"
+    if name.startswith(b"xl/"):
+        return "xlsx", "Docs"
+    if name.startswith(b"ppt/"):
+        return "pptx", "Docs"
+    if name == b"[Content_Types].xml" or name.startswith(b"_rels/"):
+        return "ooxml", "Docs"
+    if name == b"mimetype" and b"application/vnd.oasis.opendocument" in head:
+        return "odf", "Docs"
+    return "zip", "Archives"
+
+
+def sniff_bytes(head):
+    """(type, category) for a file header, or None if unrecognised"""
+    if head[:4] == b"PK\x03\x04":
+        return _zip_kind(head)
+    if head[:4] == b"RIFF" and head[8:12] in _riff:
+        return _riff[head[8:12]]
+    if head[4:8] == b"ftyp":
+        return _ftyp.get(head[8:12], ("mp4", "Videos"))
+    for offset, sig, kind, cat in signatures:
+        if head[offset:offset + len(sig)] == sig:
+            return kind, cat
+    return None
+
+
+@instrument.timed("sniff")
+def sniff_file(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(header_size)
+    except OSError:
+        return None
+    instrument.add("bytes_read", len(head))
+    return sniff_bytes(head)
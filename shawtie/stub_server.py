@@ -0,0 +1,185 @@
+"""Local OpenAI-compatible stub server for offline runs and benchmarks.
+
+Answers /v1/chat/completions with deterministic replies derived from a
+hash of the prompt, recognising shawtie's classify, batch, analyze and
+rename prompts. Latency and error injection make it usable for load and
+retry testing:
+
+    python -m shawtie.stub_server --port 8765 --latency 0.2 --error-rate 0.05
+    SHAWTIE_API_URL=http://127.0.0.1:8765/v1/chat/completions shawtie ~/Downloads
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+categories = ["Images", "Videos", "Audio", "Docs", "Code", "Archives", "Misc"]
+words = ["alpha", "budget", "notes", "summary", "draft", "invoice", "report", "meeting",
+         "holiday", "project", "recipe", "letter", "backup", "sketch", "music", "review"]
+
+_batch_item = re.compile(r"^\[(\d+)\] Filename: (.*)$", re.M)
+_filename = re.compile(r"^(?:Original )?[Ff]ilename: (.*)$", re.M)
+
+
+def _digest(text):
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8", "replace")).digest()[:8], "big")
+
+
+def pick_category(text):
+    return categories[_digest(text) % len(categories)]
+
+
+def pick_name(text):
+    h = _digest(text)
+    return " ".join(words[(h >> (8 * i)) % len(words)] for i in range(3))
+
+
+def prompt_text(messages):
+    parts = []
+    for message in messages or []:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+            parts.extend(p["image_url"].get("url", "")[-64:] for p in content
+                         if isinstance(p, dict) and isinstance(p.get("image_url"), dict))
+    return "\n".join(parts)
+
+
+def reply(messages):
+    """The deterministic answer shawtie expects for a chat prompt"""
+    text = prompt_text(messages)
+    items = _batch_item.findall(text)
+    if items:
+        if '"name"' in text:
+            return json.dumps({num: {"category": pick_category(name), "name": pick_name(name)} for num, name in items})
+        return json.dumps({num: pick_category(name) for num, name in items})
+    match = _filename.search(text)
+    key = match.group(1) if match else text
+    if '"category"' in text and '"name"' in text:
+        return json.dumps({"category": pick_category(key), "name": pick_name(text)})
+    if "ONE best category" in text:
+        return pick_category(key)
+    return pick_name(text)
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=0.1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def roll(self):
+        """(delay, status) for the next request"""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.random.uniform(0, self.jitter) if self.jitter else self.latency
+            r = self.random.random()
+            if r < self.throttle_rate:
+                self.throttled += 1
+                return delay, 429
+            if r < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return delay, 500
+            return delay, 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid JSON"}})
+            return
+        delay, status = self.config.roll()
+        if delay:
+            time.sleep(delay)
+        if status == 429:
+            self._send(429, {"error": {"message": "rate limited"}},
+                       {"Retry-After": str(self.config.retry_after)})
+            return
+        if status != 200:
+            self._send(status, {"error": {"message": "injected failure"}})
+            return
+        content = reply(body.get("messages"))
+        self._send(200, {
+            "id": "stub-" + hashlib.sha1(raw).hexdigest()[:12],
+            "object": "chat.completion",
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        })
+
+
+def start(host="127.0.0.1", port=0, **options):
+    """Serve in a daemon thread; returns (server, chat completions URL)"""
+    handler = type("StubHandler", (_Handler,), {"config": StubConfig(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1/chat/completions"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub for shawtie")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    server, url = start(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                        retry_after=args.retry_after, seed=args.seed)
+    print(f"Stub AI endpoint listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Long-running watch mode built on Linux inotify"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import historydb, instrument, learn
+from .main import analyze_file, commit_move, console, ignore_dirs, is_junk, load_rules, scan_files
+from .ruleset import compile_rules
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+_event = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal ctypes wrapper around the inotify syscalls"""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}
+
+    def add(self, path, mask=WATCH_MASK):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.paths[wd] = str(path)
+        return wd
+
+    def read(self, timeout):
+        """Yield (mask, full path) for events arriving within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _event.unpack_from(buf, offset)
+            offset += _event.size
+            name = buf[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            base = self.paths.get(wd)
+            if base is None and not mask & IN_Q_OVERFLOW:
+                continue
+            yield mask, os.path.join(base, os.fsdecode(name)) if base and name else base
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch(directory, dest_dir=None, recursive=True, workers=1, settle=2.0, use_model=False):
+    """Sort files as they appear in directory until interrupted.
+
+    A file is only sorted once it has had no inotify events for ``settle``
+    seconds, so downloads still being written are left alone. The worker
+    pool, HTTP session and AI cache are shared across events.
+    """
+    source = Path(directory).resolve()
+    dest = Path(dest_dir).resolve() if dest_dir else source / "sorted"
+    if not source.is_dir():
+        console.print(f"[red]Not a directory: {directory}[/red]")
+        return
+    rules_dict = compile_rules(load_rules())
+    model = None
+    if use_model:
+        model = learn.load()
+        if learn.train(model, rules_dict):
+            learn.save(model)
+    notify = Inotify()
+    dest_str = str(dest)
+
+    def in_dest(path):
+        return path == dest_str or path.startswith(dest_str + os.sep)
+
+    def watch_tree(root):
+        if in_dest(root):
+            return
+        try:
+            notify.add(root)
+        except OSError as e:
+            console.print(f"[yellow]Cannot watch {root}: {e}[/yellow]")
+            return
+        if not recursive:
+            return
+        try:
+            entries = list(os.scandir(root))
+        except OSError:
+            # Gone already, e.g. a temporary extraction folder.
+            return
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir and entry.name not in ignore_dirs:
+                watch_tree(entry.path)
+
+    watch_tree(str(source))
+    session = historydb.begin_session(source, dest)
+    historydb.set_status(session, "watching")
+    console.print(f"[bold green]👀 Watching[/bold green] {source} [dim](session {session}, Ctrl-C to stop)[/dim]")
+
+    quiet = {}
+    running = {}
+    sorted_count = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            while True:
+                for mask, path in notify.read(0.5):
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were lost; treat everything present as new.
+                        for entry in scan_files(source, recursive, exclude=[dest]):
+                            quiet[entry.path] = time.monotonic()
+                        continue
+                    if mask & IN_ISDIR:
+                        if (recursive and mask & (IN_CREATE | IN_MOVED_TO) and not in_dest(path)
+                                and os.path.basename(path) not in ignore_dirs):
+                            watch_tree(path)
+                            for entry in scan_files(path, recursive, exclude=[dest]):
+                                quiet[entry.path] = time.monotonic()
+                        continue
+                    if mask & (IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF):
+                        quiet.pop(path, None)
+                        continue
+                    if not is_junk(path):
+                        quiet[path] = time.monotonic()
+
+                now = time.monotonic()
+                for path, last in list(quiet.items()):
+                    if now - last >= settle and path not in running:
+                        del quiet[path]
+                        if os.path.isfile(path):
+                            running[path] = pool.submit(analyze_file, path, rules_dict, model=model)
+
+                for path, fut in list(running.items()):
+                    if not fut.done():
+                        continue
+                    del running[path]
+                    if path in quiet or not os.path.isfile(path):
+                        # Touched again while being analysed; it will be retried.
+                        continue
+                    cat = None
+                    try:
+                        cat, renamed, extra = fut.result()
+                        size = os.path.getsize(path)
+                        dest_file = commit_move(Path(path), cat, renamed, dest, session, extra)
+                        sorted_count += 1
+                        instrument.count_file("sorted", cat, size)
+                        console.print(f"  [green]✓[/green] {os.path.basename(path)} → "
+                                      f"[cyan]{cat}[/cyan]/{dest_file.name}")
+                    except Exception as e:
+                        instrument.count_file("errored", cat)
+                        console.print(f"  [red]✗[/red] {os.path.basename(path)}: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        notify.close()
+        historydb.set_status(session, "done")
+    console.print(f"\n[bold]Stopped watching.[/bold] Sorted {sorted_count} files in session {session}.")
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+# Stores and config files are resolved from HOME when shawtie is imported.
+os.environ["HOME"] = tempfile.mkdtemp(prefix="shawtie-home-")
+
+import pytest
+
+from shawtie import cache, historydb, metaindex
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path):
+    historydb.configure(path=tmp_path / "history.db", legacy_path=tmp_path / "history.json")
+    cache.configure(path=tmp_path / "cache.db")
+    metaindex.configure(path=tmp_path / "metadata.db")
+    yield
@@ -0,0 +1,37 @@
+import json
+import re
+
+from shawtie import cache, main
+
+
+def test_batch_mode_names_text_files_without_extra_requests(tmp_path, monkeypatch):
+    prompts = []
+
+    def ai(model, messages, **kwargs):
+        prompt = messages[0]["content"]
+        prompts.append(prompt)
+        items = re.findall(r"^\[(\d+)\] Filename: (.*)$", prompt, re.M)
+        return json.dumps({n: {"category": "Docs", "name": f"note {name}"} for n, name in items})
+
+    monkeypatch.setattr(main, "ai", ai)
+    cache.configure(enabled=False)
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(6):
+        (src / f"memo{i}").write_text(f"plain text memo number {i}")
+
+    try:
+        main.sort_directory(src, workers=2, batch_size=3)
+    finally:
+        cache.configure(enabled=True)
+
+    assert len(prompts) == 2
+    names = sorted(p.name for p in (src / "sorted" / "Docs").iterdir())
+    assert len(names) == 6
+    assert all(n.startswith("note memo") for n in names)
+
+
+def test_parse_batch_answer_accepts_names_and_bare_categories():
+    assert main.parse_batch_answer('{"1": {"category": "Docs", "name": "tax letter"}, "2": "Code"}') == {
+        1: ("Docs", "tax letter"), 2: ("Code", None)}
+    assert main.parse_batch_answer("1: Docs\n[2] Code") == {1: ("Docs", None), 2: ("Code", None)}
@@ -0,0 +1,39 @@
+from shawtie import cache, main
+
+
+def fake_ai(calls):
+    def ai(model, messages, **kwargs):
+        prompt = messages[0]["content"]
+        if not isinstance(prompt, str):
+            prompt = str(prompt)
+        name = "quarterly report" if "dupbody" in prompt else "other notes"
+        calls.append(name)
+        if "JSON" in prompt:
+            return '{"category": "Docs", "name": "%s"}' % name
+        return name
+    return ai
+
+
+def test_far_apart_duplicate_reuses_first_copy_category_and_name(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "ai", fake_ai(calls))
+    cache.configure(enabled=False)
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "first.txt").write_text("dupbody")
+    for i in range(20):
+        (src / f"filler{i:02d}.txt").write_text(f"filler {i:02d}")
+    # Subdirectories are scanned after the files above, well past the
+    # pending window, so the first copy has long finished.
+    (src / "sub").mkdir()
+    (src / "sub" / "copy.txt").write_text("dupbody")
+
+    try:
+        main.sort_directory(src, workers=1)
+    finally:
+        cache.configure(enabled=True)
+
+    docs = sorted(p.name for p in (src / "sorted" / "Docs").iterdir())
+    named = [n for n in docs if n.startswith("quarterly report")]
+    assert len(named) == 2
+    assert calls.count("quarterly report") == 1
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+from shawtie import historydb, main
+
+
+def journal_move(tmp_path, body="original body"):
+    src = tmp_path / "src"
+    src.mkdir(exist_ok=True)
+    origin = src / "a.txt"
+    origin.write_text(body)
+    dest_file = tmp_path / "sorted" / "Docs" / "a_1.txt"
+    dest_file.parent.mkdir(parents=True, exist_ok=True)
+    session = historydb.begin_session(src, tmp_path / "sorted")
+    st = os.stat(origin)
+    info = {"original": str(origin), "category": "Docs", "timestamp": "2026-01-01T00:00:00",
+            "ai_renamed": False, "session": session,
+            "source_size": st.st_size, "source_mtime_ns": st.st_mtime_ns}
+    historydb.begin_move(session, origin, dest_file, info)
+    return session, origin, dest_file
+
+
+def test_completed_move_is_recorded(tmp_path):
+    session, origin, dest_file = journal_move(tmp_path)
+    shutil.move(origin, dest_file)
+
+    assert main.reconcile_journal(session) == 1
+    entries = historydb.by_session(session)
+    assert [e["dest"] for e in entries] == [str(dest_file)]
+    assert "source_size" not in entries[0]
+    assert historydb.intents(session) == []
+
+
+def test_partial_copy_is_removed_and_origin_kept(tmp_path):
+    session, origin, dest_file = journal_move(tmp_path)
+    dest_file.write_text("origi")
+
+    assert main.reconcile_journal(session) == 0
+    assert not dest_file.exists()
+    assert origin.read_text() == "original body"
+    assert historydb.intents(session) == []
+
+
+def test_moved_file_survives_a_new_file_at_the_origin(tmp_path):
+    session, origin, dest_file = journal_move(tmp_path)
+    shutil.move(origin, dest_file)
+    origin.write_text("downloaded again, different")
+
+    assert main.reconcile_journal(session) == 1
+    assert dest_file.read_text() == "original body"
+    assert origin.read_text() == "downloaded again, different"
+
+
+def test_unmatched_destination_is_left_alone(tmp_path):
+    session, origin, dest_file = journal_move(tmp_path)
+    dest_file.write_text("something else entirely, longer than the original")
+    origin.write_text("changed")
+
+    assert main.reconcile_journal(session) == 0
+    assert dest_file.exists()
+    assert historydb.intents(session) == []
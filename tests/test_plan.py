@@ -0,0 +1,72 @@
+import json
+import os
+
+from shawtie import main
+from shawtie.plan import apply_plan, make_plan
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def plan_tree(tmp_path, duplicates="sort"):
+    src = tmp_path / "src"
+    write(src / "notes.txt", "meeting notes")
+    write(src / "script.py", "print('hi')")
+    write(src / "a.txt", "same body")
+    write(src / "sub" / "b.txt", "same body")
+    plan_path = tmp_path / "plan.json"
+    make_plan(src, plan_path, duplicates=duplicates, use_ai=False)
+    with open(plan_path) as f:
+        return src, plan_path, json.load(f)
+
+
+def test_plan_then_apply_moves_every_file_and_undoes(tmp_path):
+    src, plan_path, plan = plan_tree(tmp_path)
+    moves = [e for e in plan["entries"] if e["action"] == "move"]
+    assert len(moves) == 4
+    assert len({e["dest"] for e in moves}) == 4
+
+    moved, skipped, errors = apply_plan(plan_path)
+
+    assert (moved, skipped, errors) == (4, 0, 0)
+    for e in moves:
+        assert os.path.exists(e["dest"])
+        assert not os.path.exists(e["src"])
+    main.undo()
+    assert (src / "notes.txt").read_text() == "meeting notes"
+    assert (src / "sub" / "b.txt").read_text() == "same body"
+
+
+def test_apply_skips_files_changed_since_planning(tmp_path):
+    src, plan_path, _ = plan_tree(tmp_path)
+    write(src / "notes.txt", "edited after planning")
+
+    moved, skipped, errors = apply_plan(plan_path)
+
+    assert (moved, skipped, errors) == (3, 1, 0)
+    assert (src / "notes.txt").exists()
+
+
+def test_hardlink_never_links_to_a_file_the_run_did_not_move(tmp_path):
+    src, plan_path, plan = plan_tree(tmp_path, duplicates="hardlink")
+    dup = next(e for e in plan["entries"] if e.get("link_to"))
+    first_dest = dup["link_to"]
+    # Something unrelated turns up at the first copy's planned name.
+    write(tmp_path / "unrelated", "UNRELATED")
+    os.makedirs(os.path.dirname(first_dest), exist_ok=True)
+    os.replace(tmp_path / "unrelated", first_dest)
+
+    apply_plan(plan_path)
+
+    assert open(first_dest).read() == "UNRELATED"
+    assert open(dup["dest"]).read() == "same body"
+    assert not os.path.samefile(first_dest, dup["dest"])
+    # The first copy got a fresh name next to the planned one, and the
+    # duplicate is linked to it rather than to the stranger.
+    stem, ext = os.path.splitext(first_dest)
+    fallback = f"{stem}_1{ext}"
+    assert open(fallback).read() == "same body"
+    assert os.path.samefile(fallback, dup["dest"])
@@ -0,0 +1,64 @@
+import os
+
+from shawtie import ruleset
+from shawtie.ruleset import compile_rules
+
+readme_rules = {
+    "Images": ["jpg", "png"],
+    "Docs": ["txt", "pdf"],
+    "Invoices": {
+        "extensions": ["pdf"],
+        "keywords": ["invoice", "receipt"],
+        "path_prefixes": ["/data/bank"],
+        "min_size": 0, "max_size": 5_000_000,
+        "newer_than_days": 30,
+        "weight": 6,
+        "priority": 1,
+    },
+}
+
+
+def test_filters_count_once_and_do_not_beat_an_extension(tmp_path):
+    rules = compile_rules(readme_rules)
+    notes = tmp_path / "notes.txt"
+    notes.write_text("x")
+    photo = tmp_path / "holiday.jpg"
+    photo.write_bytes(b"x")
+
+    assert rules.score(str(notes)) == ("Docs", {"Docs": 10, "Invoices": 6})
+    assert rules.score(str(photo))[0] == "Images"
+
+
+def test_filters_must_all_hold(tmp_path):
+    rules = compile_rules(readme_rules)
+    old = tmp_path / "old.bin"
+    old.write_bytes(b"x")
+    os.utime(old, (0, 0))
+
+    assert rules.score(str(old))[1].get("Invoices", 0) == 0
+
+
+def test_path_prefix_matches_whole_directories():
+    rules = compile_rules(readme_rules)
+
+    assert rules.score("/data/bank/statement.bin")[1].get("Invoices") == 6
+    assert "Invoices" not in rules.score("/data/bank-old/statement.bin")[1]
+
+
+def test_duration_and_camera_filters_read_metadata(tmp_path, monkeypatch):
+    meta = {
+        "short.wav": {"audio": {"duration_seconds": 2.0}},
+        "long.wav": {"audio": {"duration_seconds": 600.0}},
+        "a.jpg": {"exif": {"camera": "Canon EOS R5"}},
+    }
+    monkeypatch.setattr(ruleset, "metadata_source", lambda path, st: meta.get(os.path.basename(path), {}))
+    rules = compile_rules({
+        "Clips": {"max_duration": 30},
+        "Canon": {"cameras": ["eos"]},
+    })
+    for name in meta:
+        (tmp_path / name).write_bytes(b"x")
+
+    assert rules.score(str(tmp_path / "short.wav"))[0] == "Clips"
+    assert rules.score(str(tmp_path / "long.wav"))[1].get("Clips", 0) == 0
+    assert rules.score(str(tmp_path / "a.jpg"))[0] == "Canon"